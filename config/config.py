@@ -16,39 +16,70 @@ class Config:
     # 视频下载地址设置为D:\coding\deepsuck\data\videos (使用原始字符串避免转义问题)
     VIDEO_DIR = r'D:\coding\deepsuck\data\videos'
     AUDIO_DIR = os.path.join(DATA_DIR, 'audios')
+    CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+    
+    # 确保存储、cookies和日志目录存在，同一进程内只检查一次
+    _dirs_ready = False
     
-    # 确保存储目录存在
     @classmethod
     def ensure_dirs(cls):
-        for dir_path in [cls.DATA_DIR, cls.VIDEO_DIR, cls.AUDIO_DIR]:
-            os.makedirs(dir_path, exist_ok=True)
+        if cls._dirs_ready:
+            return
+        for dir_path in (cls.DATA_DIR, cls.VIDEO_DIR, cls.AUDIO_DIR, cls.CACHE_DIR,
+                         cls.COOKIES_DIR, os.path.dirname(cls.LOG_FILE)):
+            # 已存在的目录只需一次stat，避免makedirs的额外系统调用
+            if not os.path.isdir(dir_path):
+                os.makedirs(dir_path, exist_ok=True)
+        cls._dirs_ready = True
     
     # 请求头配置
-    USER_AGENTS = [
+    USER_AGENTS = (
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/89.0',
         'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15',
-    ]
+    )
     
     # 反爬机制配置
     REQUEST_DELAY = 2  # 请求间隔(秒)
     MAX_RETRY = 3      # 最大重试次数
+    MAX_BACKOFF = 30   # 重试退避的最长等待时间(秒)
     RANDOM_DELAY_RANGE = (1, 3)  # 随机延迟范围(秒)
+    MAX_CONCURRENT_REQUESTS = 10  # 异步请求接口同时进行的最大请求数
+    MAX_CONCURRENT_CRAWLS = 5  # 界面批量爬取时同时爬取的最大URL数
     
     # 下载配置
-    DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 下载块大小(1MB)
+    # 下载块大小(默认4MB)，可通过环境变量调整，向下取整为64KB的整数倍以与文件系统块对齐
+    DOWNLOAD_CHUNK_SIZE = max(1, int(os.getenv('DOWNLOAD_CHUNK_SIZE', 4 * 1024 * 1024)) // (64 * 1024)) * 64 * 1024
     MAX_CONCURRENT_DOWNLOADS = 3       # 最大并发下载数
+    DOWNLOAD_CONNECTIONS = 4           # 服务器支持Range时，单个文件分段并行下载的连接数
+    # 同时下载视频和音频时由FFmpeg直接拉流合并(不落地中间文件)，默认关闭，改为先下载再合并
+    DIRECT_STREAM_MERGE = os.getenv('DIRECT_STREAM_MERGE', '').lower() in ('1', 'true', 'yes')
+    
+    # 媒体信息缓存配置
+    METADATA_CACHE_FILE = os.path.join(CACHE_DIR, 'media_info.sqlite3')
+    # 媒体信息缓存有效期(秒)，视频网站的媒体地址通常带有时效签名，不宜缓存过久
+    METADATA_CACHE_TTL_SECONDS = 30 * 60
     
     # 登录配置
     COOKIES_DIR = os.path.join(PROJECT_ROOT, 'config', 'cookies')
+    # 本地ChromeDriver路径(从环境变量加载)，设置后跳过webdriver_manager的自动解析
+    CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH', '')
+    LOGIN_WAIT_TIMEOUT = 10  # 等待登录页面元素的最长时间(秒)
+    COOKIE_PROBE_TIMEOUT = 3  # 验证已保存cookies时探测请求的超时时间(秒)
+    LOGIN_SESSION_TTL_SECONDS = 60 * 60  # 同一进程内复用已登录会话的有效期(秒)
     
     # 日志配置
     LOG_LEVEL = 'INFO'
     LOG_FILE = os.path.join(PROJECT_ROOT, 'logs', 'spider.log')
+    LOG_MAX_LINES = 5000  # 界面日志区域最多保留的行数
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # 日志文件轮转前的最大字节数
+    LOG_BACKUP_COUNT = 3  # 保留的轮转日志文件数
     
     # 合规配置
     ROBOTS_TXT_ENABLED = True  # 遵循robots.txt
     MAX_PAGES_PER_DOMAIN = 100  # 每个域名最大爬取页数
+    ROBOTS_TTL_SECONDS = 6 * 60 * 60  # robots.txt缓存有效期(秒)
+    ROBOTS_NEG_TTL_SECONDS = 10 * 60  # 获取robots.txt失败或不存在时的缓存有效期(秒)
     
     # API密钥配置(从环境变量加载)
     API_KEYS = {
@@ -60,6 +91,4 @@ class Config:
 config = Config()
 
 # 确保目录存在
-config.ensure_dirs()
-os.makedirs(config.COOKIES_DIR, exist_ok=True)
-os.makedirs(os.path.dirname(config.LOG_FILE), exist_ok=True)
\ No newline at end of file
+config.ensure_dirs()
\ No newline at end of file
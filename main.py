@@ -8,32 +8,42 @@ DeepSuck 媒体爬虫 - 主入口文件
 项目严格遵循robots协议及相关法律法规，确保数据爬取行为合法合规。
 """
 
-import os
 import sys
+import atexit
+import asyncio
+import queue
 import argparse
 import logging
+import logging.handlers
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
-# 添加项目根目录到Python路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-# 导入项目模块
+# 导入项目模块（以 python main.py 运行时，项目根目录已是sys.path[0]）
+# 爬虫和登录模块依赖较重，由用到它们的命令处理函数再导入，启动图形界面时无需加载
 from config.config import config
-from src.media_crawler import media_crawler
-from src.login_manager import login_manager
 from src.request_manager import request_manager
 from src.robots_checker import robots_checker
 
-# 配置日志
-logging.basicConfig(
-    level=config.LOG_LEVEL,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(config.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+# 配置日志：各线程只把日志记录放入队列，由后台监听线程统一写入文件和控制台
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# 日志文件按大小轮转，长时间运行时不会无限增长
+file_handler = logging.handlers.RotatingFileHandler(
+    config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT, encoding='utf-8')
+file_handler.setFormatter(log_formatter)
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+root_logger = logging.getLogger()
+# 移除子模块导入时basicConfig安装的默认处理器，避免日志重复输出
+for handler in root_logger.handlers[:]:
+    root_logger.removeHandler(handler)
+root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+root_logger.setLevel(config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
 def parse_arguments():
@@ -65,6 +75,14 @@ def parse_arguments():
     download_parser.add_argument('--output-dir', '-d', default=str(config.VIDEO_DIR), help='下载目录')
     download_parser.add_argument('--type', choices=['video', 'audio', 'both'], default='both', help='下载类型')
     
+    # 批量下载命令
+    batch_parser = subparsers.add_parser('batch-download', help='并发下载多个媒体文件')
+    batch_parser.add_argument('urls', nargs='+', help='目标URL列表')
+    batch_parser.add_argument('--output-dir', '-d', default=str(config.VIDEO_DIR), help='下载目录')
+    batch_parser.add_argument('--type', choices=['video', 'audio', 'both'], default='both', help='下载类型')
+    batch_parser.add_argument('--concurrency', '-c', type=int, default=config.MAX_CONCURRENT_DOWNLOADS,
+                              help=f'最大并发下载数(默认{config.MAX_CONCURRENT_DOWNLOADS})')
+    
     # 登录命令
     login_parser = subparsers.add_parser('login', help='登录网站')
     login_parser.add_argument('url', help='目标网站URL')
@@ -93,6 +111,8 @@ def handle_ui():
 
 def handle_crawl(args):
     """处理爬取命令"""
+    from src.media_crawler import media_crawler
+    from src.login_manager import login_manager
     try:
         # 如果需要登录
         if args.login:
@@ -109,14 +129,15 @@ def handle_crawl(args):
         # 执行爬取
         media_info = media_crawler.crawl(args.url)
         
-        # 输出结果
+        # 输出结果（只序列化一次，输出和保存共用）
+        result_json = json.dumps(media_info, ensure_ascii=False, indent=2)
         print("\n爬取结果:")
-        print(json.dumps(media_info, ensure_ascii=False, indent=2))
+        print(result_json)
         
         # 如果指定了输出文件，保存结果
         if args.output:
             with open(args.output, 'w', encoding='utf-8') as f:
-                json.dump(media_info, f, ensure_ascii=False, indent=2)
+                f.write(result_json)
             logger.info(f"爬取结果已保存到: {args.output}")
             
     except Exception as e:
@@ -125,6 +146,8 @@ def handle_crawl(args):
 
 def handle_download(args):
     """处理下载命令"""
+    from src.media_crawler import media_crawler
+    from src.login_manager import login_manager
     try:
         # 如果需要登录
         if args.login:
@@ -155,8 +178,49 @@ def handle_download(args):
         logger.error(f"下载失败: {e}")
         sys.exit(1)
 
+def _crawl_and_download(url: str, output_dir: str, download_type: str) -> Dict[str, str]:
+    """爬取并下载单个URL的媒体"""
+    from src.media_crawler import media_crawler
+    media_info = media_crawler.crawl(url)
+    return media_crawler.download(media_info, output_dir, download_type)
+
+async def _download_all(urls: List[str], output_dir: str, download_type: str, concurrency: int) -> List[Any]:
+    """在线程中并发执行下载任务，用信号量限制同时进行的任务数"""
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    
+    async def download_one(url: str) -> Dict[str, str]:
+        async with semaphore:
+            logger.info(f"开始下载: {url}")
+            return await loop.run_in_executor(None, _crawl_and_download, url, output_dir, download_type)
+    
+    return await asyncio.gather(*(download_one(url) for url in urls), return_exceptions=True)
+
+def handle_download_batch(args):
+    """处理批量下载命令"""
+    concurrency = max(1, args.concurrency)
+    logger.info(f"正在并发下载 {len(args.urls)} 个媒体到: {args.output_dir}（并发数: {concurrency}）")
+    results = asyncio.run(_download_all(args.urls, args.output_dir, args.type, concurrency))
+    
+    # 输出结果
+    failed = 0
+    print("\n下载结果:")
+    for url, result in zip(args.urls, results):
+        print(f"\n{url}")
+        if isinstance(result, Exception):
+            failed += 1
+            logger.error(f"下载失败: {url}: {result}")
+            print(f"  失败: {result}")
+            continue
+        for media_type, path in result.items():
+            print(f"  {media_type}: {path}")
+    
+    if failed:
+        sys.exit(1)
+
 def handle_login(args):
     """处理登录命令"""
+    from src.login_manager import login_manager
     try:
         success = login_manager.login(
             args.url,
@@ -192,8 +256,14 @@ def handle_robots(args):
 
 def main():
     """主函数"""
-    # 解析命令行参数
-    args = parse_arguments()
+    # 启动图形界面是最常见的用法，跳过构建完整的argparse解析器
+    if sys.argv[1:] == ['ui']:
+        args = None
+        command = 'ui'
+    else:
+        # 解析命令行参数
+        args = parse_arguments()
+        command = args.command
     
     # 显示欢迎信息
     print("="*60)
@@ -202,15 +272,17 @@ def main():
     print("="*60)
     
     # 根据命令执行不同的操作
-    if args.command == 'ui':
+    if command == 'ui':
         handle_ui()
-    elif args.command == 'crawl':
+    elif command == 'crawl':
         handle_crawl(args)
-    elif args.command == 'download':
+    elif command == 'download':
         handle_download(args)
-    elif args.command == 'login':
+    elif command == 'batch-download':
+        handle_download_batch(args)
+    elif command == 'login':
         handle_login(args)
-    elif args.command == 'robots':
+    elif command == 'robots':
         handle_robots(args)
     else:
         # 如果没有指定命令，显示帮助信息
@@ -219,6 +291,7 @@ def main():
         print("  python main.py ui                # 启动图形用户界面")
         print("  python main.py crawl <URL>       # 爬取媒体信息")
         print("  python main.py download <URL>    # 下载媒体文件")
+        print("  python main.py batch-download <URL> [<URL> ...]  # 并发下载多个媒体文件")
         print("  python main.py login <URL>       # 登录网站")
         print("  python main.py robots <URL>      # 检查robots.txt规则")
         
@@ -1,37 +1,99 @@
 import os
-import logging
+import json
 import time
-from typing import Dict, Any, Optional, Tuple, Union
+import atexit
+import logging
+import functools
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple, Union
 from urllib.parse import urlparse
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from webdriver_manager.chrome import ChromeDriverManager
 from config.config import config
 from src.request_manager import request_manager
 
-# 配置日志
-logging.basicConfig(level=config.LOG_LEVEL)
+if TYPE_CHECKING:
+    # selenium仅在登录时才需要，类型注解用导入不在运行时执行
+    from selenium import webdriver
+
+# 日志处理器由入口程序统一配置
 logger = logging.getLogger(__name__)
 
+# 网站登录配置
+# login_url: 登录页地址，为None时直接打开目标URL
+# probe_url: 验证已保存cookies的地址，未登录时会跳转到登录页；为None时不做验证
+# form_steps: 自动登录时依次执行的 (操作, 元素定位, 填写字段) 步骤，为None表示不支持自动登录；
+#             元素定位的方式字符串与selenium.webdriver.common.by.By中的取值一致
+SITE_SPECS: Dict[str, Dict[str, Any]] = {
+    'youtube.com': {
+        'name': 'Google',
+        'login_url': 'https://accounts.google.com/ServiceLogin',
+        'probe_url': 'https://myaccount.google.com/',
+        'form_steps': [
+            ('fill', ('id', 'identifierId'), 'username'),
+            ('click', ('id', 'identifierNext'), None),
+            ('fill', ('name', 'Passwd'), 'password'),
+            ('click', ('id', 'passwordNext'), None),
+        ],
+    },
+    'bilibili.com': {
+        'name': 'Bilibili',
+        'login_url': 'https://passport.bilibili.com/login',
+        'probe_url': 'https://account.bilibili.com/account/home',
+        'form_steps': None,  # B站登录需要扫码或验证码，仅支持手动登录
+    },
+    'soundcloud.com': {
+        'name': 'SoundCloud',
+        'login_url': 'https://soundcloud.com/login',
+        'probe_url': None,
+        'form_steps': [
+            ('fill', ('name', 'username'), 'username'),
+            ('fill', ('name', 'password'), 'password'),
+            ('click', ('class name', 'signinInitial-step0__submitButton'), None),
+        ],
+    },
+    # 可以添加更多网站的登录配置
+}
+
+# 未配置网站使用的通用登录配置
+GENERIC_SPEC: Dict[str, Any] = {'name': '通用', 'login_url': None, 'probe_url': None, 'form_steps': None}
+
+@functools.lru_cache(maxsize=256)
+def _parse_host(url: str) -> str:
+    """解析URL的主机名（小写、不含端口），批量爬取时URL经常重复，缓存解析结果"""
+    return urlparse(url).hostname or ''
+
+@functools.lru_cache(maxsize=64)
+def _read_cookie_file(cookie_file: str, mtime_ns: int) -> Dict[str, str]:
+    """读取并解析cookies文件，以修改时间为缓存键，文件未变化时直接复用解析结果"""
+    with open(cookie_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 class LoginManager:
     """登录管理器，处理网站登录验证和会话管理"""
     
+    # 已解析的ChromeDriver路径，进程内只解析一次
+    _DRIVER_PATH: Optional[str] = None
+    
     def __init__(self):
-        self._site_login_methods = {
-            'youtube.com': self._login_google,
-            'bilibili.com': self._login_bilibili,
-            'soundcloud.com': self._login_soundcloud,
-            # 可以添加更多网站的登录方法
-        }
+        # cookies文件路径模板
+        self._cookie_path_tmpl = os.path.join(config.COOKIES_DIR, '{}.json')
+        # 复用的浏览器实例，首次登录时创建，进程退出时关闭
+        self._driver: Optional['webdriver.Chrome'] = None
+        # 本进程内已登录的会话: {(cookies域名, 用户名): {'cookies': cookies, 'expires_at': 过期时间}}，
+        # 有效期内再次登录同一网站时直接复用，不再读取和验证cookies文件或启动浏览器
+        self._session_cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        atexit.register(self._shutdown)
     
-    def _get_login_method(self, url: str) -> Optional[callable]:
-        """根据URL获取对应的登录方法"""
-        domain = urlparse(url).netloc.lower()
-        for site_domain, method in self._site_login_methods.items():
-            if site_domain in domain:
-                return method
-        return self._login_generic  # 默认登录方法
+    def _get_site_spec(self, url: str) -> Tuple[str, Dict[str, Any]]:
+        """根据URL获取对应的网站登录配置，返回 (cookies域名, 登录配置)"""
+        host = _parse_host(url)
+        # 由完整主机名逐级去掉子域名，在登录配置表中做字典查找
+        parts = host.split('.')
+        for i in range(len(parts) - 1):
+            site_domain = '.'.join(parts[i:])
+            spec = SITE_SPECS.get(site_domain)
+            if spec:
+                return site_domain, spec
+        # 默认登录配置；cookies文件名沿用带端口的netloc，与之前保存的文件保持一致
+        return urlparse(url).netloc.lower(), GENERIC_SPEC
     
     def login(self, url: str, username: Optional[str] = None, password: Optional[str] = None, 
               use_selenium: bool = False, manual: bool = False) -> bool:
@@ -46,11 +108,25 @@ class LoginManager:
             是否登录成功
         """
         logger.info(f"开始登录: {url}")
-        login_method = self._get_login_method(url)
+        domain, spec = self._get_site_spec(url)
+        
+        session_key = (domain, username or '*')
+        session = self._session_cache.get(session_key)
+        if session is not None and session['expires_at'] > time.monotonic():
+            # 重新设置cookies，请求会话可能已被清除
+            request_manager.set_cookies(session['cookies'])
+            logger.info(f"复用本次运行中已登录的会话: {url}")
+            return True
         
         try:
-            result = login_method(url, username, password, use_selenium, manual)
+            result = self._run_login(url, domain, spec, username, password, use_selenium, manual)
             if result:
+                cookies = self._load_cookies(domain)
+                if cookies:
+                    self._session_cache[session_key] = {
+                        'cookies': cookies,
+                        'expires_at': time.monotonic() + config.LOGIN_SESSION_TTL_SECONDS,
+                    }
                 logger.info(f"登录成功: {url}")
             else:
                 logger.warning(f"登录失败: {url}")
@@ -59,42 +135,82 @@ class LoginManager:
             logger.error(f"登录异常: {e}")
             return False
     
-    def _create_selenium_driver(self, headless: bool = False) -> webdriver.Chrome:
-        """创建Selenium WebDriver实例"""
+    def _create_selenium_driver(self, headless: bool = False) -> 'webdriver.Chrome':
+        """获取Selenium WebDriver实例，同一进程内的多次登录复用同一个浏览器"""
+        if self._driver is not None:
+            try:
+                # 访问属性以确认浏览器仍然存活（用户可能已手动关闭窗口）
+                self._driver.current_url
+                return self._driver
+            except Exception:
+                logger.debug("已有浏览器实例不可用，重新创建")
+                self._driver = None
+        
+        # 延迟导入selenium和webdriver_manager，避免crawl/robots等命令承担其导入开销
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service as ChromeService
+        from selenium.webdriver.chrome.options import Options as ChromeOptions
+        from webdriver_manager.chrome import ChromeDriverManager
+        
         chrome_options = ChromeOptions()
         
         # 配置Chrome选项
         chrome_options.add_argument('--no-sandbox')
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        # DOM就绪即返回，不等待所有子资源加载完成
+        chrome_options.page_load_strategy = 'eager'
+        # 屏蔽通知弹窗；图片保持开启，手动登录需要显示二维码和验证码
+        chrome_options.add_experimental_option('prefs', {
+            'profile.default_content_setting_values.notifications': 2,
+        })
         chrome_options.add_argument(f'user-agent={request_manager._random_user_agent()}')
         
         # 是否无头模式
         if headless:
             chrome_options.add_argument('--headless')
         
+        # 解析ChromeDriver路径：优先使用配置的本地驱动，否则由webdriver_manager解析并缓存
+        if LoginManager._DRIVER_PATH is None:
+            LoginManager._DRIVER_PATH = config.CHROMEDRIVER_PATH or ChromeDriverManager().install()
+        
         # 创建WebDriver
         driver = webdriver.Chrome(
-            service=ChromeService(ChromeDriverManager().install()),
+            service=ChromeService(LoginManager._DRIVER_PATH),
             options=chrome_options
         )
         
+        self._driver = driver
         return driver
     
-    def _extract_cookies_from_driver(self, driver: webdriver.Chrome) -> Dict[str, str]:
+    def _reset_driver(self, driver: 'webdriver.Chrome') -> None:
+        """清空浏览器状态以便下次登录复用，代替关闭浏览器"""
+        try:
+            driver.delete_all_cookies()
+            driver.get('about:blank')
+        except Exception as e:
+            logger.debug(f"重置浏览器失败: {e}")
+            self._shutdown()
+    
+    def _shutdown(self) -> None:
+        """关闭复用的浏览器实例"""
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+            self._driver = None
+    
+    def _extract_cookies_from_driver(self, driver: 'webdriver.Chrome') -> Dict[str, str]:
         """从Selenium WebDriver中提取cookies"""
-        cookies = {}
-        for cookie in driver.get_cookies():
-            cookies[cookie['name']] = cookie['value']
-        return cookies
+        return {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
     
     def _save_cookies(self, domain: str, cookies: Dict[str, str]) -> None:
         """保存cookies到文件"""
-        # 创建cookies目录（如果不存在）
-        os.makedirs(config.COOKIES_DIR, exist_ok=True)
-        
-        # 保存cookies文件
-        cookie_file = os.path.join(config.COOKIES_DIR, f"{domain.replace('.', '_')}.json")
+        # cookies目录已在导入配置时创建
+        cookie_file = self._cookie_path_tmpl.format(domain.replace('.', '_'))
         with open(cookie_file, 'w', encoding='utf-8') as f:
             json.dump(cookies, f, ensure_ascii=False, indent=2)
         
@@ -102,228 +218,134 @@ class LoginManager:
     
     def _load_cookies(self, domain: str) -> Optional[Dict[str, str]]:
         """从文件加载cookies"""
-        cookie_file = os.path.join(config.COOKIES_DIR, f"{domain.replace('.', '_')}.json")
+        cookie_file = self._cookie_path_tmpl.format(domain.replace('.', '_'))
         
-        if os.path.exists(cookie_file):
-            try:
-                with open(cookie_file, 'r', encoding='utf-8') as f:
-                    cookies = json.load(f)
-                logger.info(f"从{cookie_file}加载cookies成功")
-                return cookies
-            except Exception as e:
-                logger.error(f"加载cookies失败: {e}")
+        try:
+            mtime_ns = os.stat(cookie_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        
+        try:
+            # 返回副本，避免调用方修改缓存中的字典
+            cookies = _read_cookie_file(cookie_file, mtime_ns).copy()
+            logger.info(f"从{cookie_file}加载cookies成功")
+            return cookies
+        except Exception as e:
+            logger.error(f"加载cookies失败: {e}")
         
         return None
     
-    # 网站特定登录方法
-    def _login_google(self, url: str, username: Optional[str] = None, password: Optional[str] = None, 
-                      use_selenium: bool = True, manual: bool = False) -> bool:
-        """Google/YouTube登录"""
-        domain = 'youtube.com'
-        
-        # 尝试加载已保存的cookies
-        saved_cookies = self._load_cookies(domain)
-        if saved_cookies:
-            request_manager.set_cookies(saved_cookies)
-            # 验证cookies是否有效（可以添加验证逻辑）
+    def _cookies_valid(self, spec: Dict[str, Any]) -> bool:
+        """用一次HEAD请求验证会话中的cookies是否仍处于登录状态"""
+        probe_url = spec.get('probe_url')
+        if not probe_url:
             return True
         
-        if not use_selenium:
-            logger.warning("Google登录需要使用Selenium")
-            return False
-        
         try:
-            # 创建WebDriver
-            driver = self._create_selenium_driver(headless=False)
-            
-            # 导航到登录页面
-            driver.get('https://accounts.google.com/ServiceLogin')
-            
-            if manual:
-                logger.info("请在打开的浏览器中手动登录")
-                logger.info("登录完成后，请按Enter键继续...")
-                input()  # 等待用户手动登录
-            elif username and password:
-                # 自动填充用户名和密码（简化版，实际可能需要处理验证码等）
-                time.sleep(2)
-                # 输入用户名
-                email_input = driver.find_element('id', 'identifierId')
-                email_input.send_keys(username)
-                driver.find_element('id', 'identifierNext').click()
-                time.sleep(2)
-                # 输入密码
-                password_input = driver.find_element('name', 'Passwd')
-                password_input.send_keys(password)
-                driver.find_element('id', 'passwordNext').click()
-                time.sleep(5)  # 等待登录完成
-            else:
-                logger.error("需要提供用户名和密码，或者启用手动登录")
-                driver.quit()
-                return False
-            
-            # 提取cookies
-            cookies = self._extract_cookies_from_driver(driver)
-            
-            # 保存cookies
-            self._save_cookies(domain, cookies)
-            
-            # 设置到请求管理器
-            request_manager.set_cookies(cookies)
-            
-            # 关闭浏览器
-            driver.quit()
-            
-            return True
+            response = request_manager.session.head(
+                probe_url, allow_redirects=False, timeout=config.COOKIE_PROBE_TIMEOUT
+            )
+            verdict = self._probe_verdict(response)
+            if verdict is None:
+                # 服务器可能不支持HEAD(405)或拦截了HEAD请求，改用GET再验证一次，只读取响应头
+                with request_manager.session.get(
+                    probe_url, allow_redirects=False, stream=True, timeout=config.COOKIE_PROBE_TIMEOUT
+                ) as response:
+                    verdict = self._probe_verdict(response)
         except Exception as e:
-            logger.error(f"Google登录失败: {e}")
-            return False
-    
-    def _login_bilibili(self, url: str, username: Optional[str] = None, password: Optional[str] = None, 
-                        use_selenium: bool = True, manual: bool = False) -> bool:
-        """Bilibili登录"""
-        domain = 'bilibili.com'
-        
-        # 尝试加载已保存的cookies
-        saved_cookies = self._load_cookies(domain)
-        if saved_cookies:
-            request_manager.set_cookies(saved_cookies)
-            # 验证cookies是否有效（可以添加验证逻辑）
+            # 网络异常时无法判断，沿用已保存的cookies
+            logger.debug(f"验证cookies失败: {e}")
             return True
         
-        if not use_selenium:
-            logger.warning("Bilibili登录需要使用Selenium")
-            return False
-        
-        try:
-            # 创建WebDriver
-            driver = self._create_selenium_driver(headless=False)
-            
-            # 导航到登录页面
-            driver.get('https://passport.bilibili.com/login')
-            
-            if manual:
-                logger.info("请在打开的浏览器中手动登录")
-                logger.info("登录完成后，请按Enter键继续...")
-                input()  # 等待用户手动登录
-            elif username and password:
-                # 实际应用中需要处理B站的登录方式，这里仅作为示例
-                logger.warning("Bilibili自动登录功能尚未实现，请使用手动登录")
-                driver.quit()
-                return False
-            else:
-                logger.error("需要提供用户名和密码，或者启用手动登录")
-                driver.quit()
-                return False
-            
-            # 提取cookies
-            cookies = self._extract_cookies_from_driver(driver)
-            
-            # 保存cookies
-            self._save_cookies(domain, cookies)
-            
-            # 设置到请求管理器
-            request_manager.set_cookies(cookies)
-            
-            # 关闭浏览器
-            driver.quit()
-            
+        if verdict is None:
+            # 403(反爬验证)、5xx等状态无法说明cookies失效，沿用已保存的cookies
+            logger.debug(f"验证cookies时收到状态码{response.status_code}，沿用已保存的cookies")
             return True
-        except Exception as e:
-            logger.error(f"Bilibili登录失败: {e}")
-            return False
+        return verdict
     
-    def _login_soundcloud(self, url: str, username: Optional[str] = None, password: Optional[str] = None, 
-                          use_selenium: bool = True, manual: bool = False) -> bool:
-        """SoundCloud登录"""
-        domain = 'soundcloud.com'
-        
-        # 尝试加载已保存的cookies
-        saved_cookies = self._load_cookies(domain)
-        if saved_cookies:
-            request_manager.set_cookies(saved_cookies)
-            # 验证cookies是否有效（可以添加验证逻辑）
-            return True
-        
-        if not use_selenium:
-            logger.warning("SoundCloud登录需要使用Selenium")
-            return False
-        
-        try:
-            # 创建WebDriver
-            driver = self._create_selenium_driver(headless=False)
-            
-            # 导航到登录页面
-            driver.get('https://soundcloud.com/login')
-            
-            if manual:
-                logger.info("请在打开的浏览器中手动登录")
-                logger.info("登录完成后，请按Enter键继续...")
-                input()  # 等待用户手动登录
-            elif username and password:
-                # 自动填充用户名和密码
-                time.sleep(2)
-                # 输入用户名
-                username_input = driver.find_element('name', 'username')
-                username_input.send_keys(username)
-                # 输入密码
-                password_input = driver.find_element('name', 'password')
-                password_input.send_keys(password)
-                # 点击登录按钮
-                login_button = driver.find_element('class name', 'signinInitial-step0__submitButton')
-                login_button.click()
-                time.sleep(5)  # 等待登录完成
-            else:
-                logger.error("需要提供用户名和密码，或者启用手动登录")
-                driver.quit()
-                return False
-            
-            # 提取cookies
-            cookies = self._extract_cookies_from_driver(driver)
-            
-            # 保存cookies
-            self._save_cookies(domain, cookies)
-            
-            # 设置到请求管理器
-            request_manager.set_cookies(cookies)
-            
-            # 关闭浏览器
-            driver.quit()
-            
+    @staticmethod
+    def _probe_verdict(response) -> Optional[bool]:
+        """根据探测响应判断cookies是否有效，无法判断时返回None"""
+        if 200 <= response.status_code < 300:
             return True
-        except Exception as e:
-            logger.error(f"SoundCloud登录失败: {e}")
+        if response.status_code == 401:
             return False
+        if 300 <= response.status_code < 400:
+            # 未登录时会跳转到登录页
+            location = response.headers.get('Location', '').lower()
+            return 'login' not in location and 'signin' not in location
+        return None
     
-    def _login_generic(self, url: str, username: Optional[str] = None, password: Optional[str] = None, 
-                       use_selenium: bool = True, manual: bool = False) -> bool:
-        """通用登录方法"""
-        domain = urlparse(url).netloc
+    def _run_login(self, url: str, domain: str, spec: Dict[str, Any], 
+                   username: Optional[str] = None, password: Optional[str] = None, 
+                   use_selenium: bool = True, manual: bool = False) -> bool:
+        """按网站登录配置执行登录
+        Args:
+            url: 登录的网站URL
+            domain: cookies对应的域名
+            spec: SITE_SPECS中的网站登录配置
+            username: 用户名
+            password: 密码
+            use_selenium: 是否使用Selenium进行登录
+            manual: 是否手动登录（用户在浏览器中操作）
+        Returns:
+            是否登录成功
+        """
+        name = spec['name']
         
         # 尝试加载已保存的cookies
         saved_cookies = self._load_cookies(domain)
         if saved_cookies:
             request_manager.set_cookies(saved_cookies)
-            # 验证cookies是否有效（可以添加验证逻辑）
-            return True
+            if self._cookies_valid(spec):
+                return True
+            # cookies已失效，移除后重新登录
+            logger.info(f"已保存的{name} cookies已失效，需要重新登录")
+            request_manager.remove_cookies(saved_cookies)
         
         if not use_selenium:
-            logger.warning("通用登录需要使用Selenium")
+            logger.warning(f"{name}登录需要使用Selenium")
             return False
         
         try:
+            from selenium.webdriver.support.ui import WebDriverWait
+            from selenium.webdriver.support import expected_conditions as EC
+            from selenium.common.exceptions import TimeoutException
+            
             # 创建WebDriver
             driver = self._create_selenium_driver(headless=False)
             
-            # 导航到目标URL
-            driver.get(url)
+            # 导航到登录页面（通用登录直接打开目标URL）
+            driver.get(spec['login_url'] or url)
             
+            form_steps = spec['form_steps']
             if manual:
                 logger.info(f"请在打开的浏览器中手动登录 {domain}")
                 logger.info("登录完成后，请按Enter键继续...")
                 input()  # 等待用户手动登录
+            elif not form_steps:
+                logger.warning(f"{name}自动登录功能尚未实现，请使用手动登录")
+                self._reset_driver(driver)
+                return False
+            elif username and password:
+                # 按配置依次填写表单、点击按钮（简化版，实际可能需要处理验证码等）
+                wait = WebDriverWait(driver, config.LOGIN_WAIT_TIMEOUT)
+                credentials = {'username': username, 'password': password}
+                element = None
+                for action, locator, field in form_steps:
+                    element = wait.until(EC.element_to_be_clickable(locator))
+                    if action == 'fill':
+                        element.send_keys(credentials[field])
+                    else:
+                        element.click()
+                # 等待登录完成（最后操作的表单元素被页面替换）
+                try:
+                    wait.until(EC.staleness_of(element))
+                except TimeoutException:
+                    logger.warning(f"等待{name}登录完成超时")
             else:
-                logger.warning("通用自动登录功能尚未实现，请使用手动登录")
-                driver.quit()
+                logger.error("需要提供用户名和密码，或者启用手动登录")
+                self._reset_driver(driver)
                 return False
             
             # 提取cookies
@@ -335,12 +357,12 @@ class LoginManager:
             # 设置到请求管理器
             request_manager.set_cookies(cookies)
             
-            # 关闭浏览器
-            driver.quit()
+            # 重置浏览器以便复用
+            self._reset_driver(driver)
             
             return True
         except Exception as e:
-            logger.error(f"通用登录失败: {e}")
+            logger.error(f"{name}登录失败: {e}")
             return False
 
 # 导出全局实例
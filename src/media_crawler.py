@@ -1,23 +1,341 @@
+import io
 import os
 import re
 import json
 import logging
-import os
+import functools
+import shutil
 import subprocess
-from typing import Dict, Any, List, Optional, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple, Union
 from urllib.parse import urlparse, unquote
 from config.config import config
 from src.request_manager import request_manager
-from bs4 import BeautifulSoup
+from src.robots_checker import robots_checker
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import EncodingDetector
+from lxml import etree
 import validators
 import requests
 import time
 import random
 
+# 可选使用orjson解析B站页面中体积较大的播放信息JSON，未安装时回退到标准库
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 可选使用ijson的C后端流式解析播放信息，只构建需要的data.dash部分；纯Python后端比整体解析更慢，不使用
+try:
+    import ijson
+    _ijson = ijson if ijson.backend == 'yajl2_c' else None
+except ImportError:
+    _ijson = None
+
 # 配置日志
 logging.basicConfig(level=config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+# 页面源码中B站播放信息变量的匹配模式（直接作用于响应的原始字节）
+_PLAYINFO_RE = re.compile(rb'window\.__playinfo__\s*=\s*(\{.*?\})\s*;?\s*</script>', re.DOTALL)
+_INITIAL_STATE_RE = re.compile(rb'window\.__INITIAL_STATE__\s*=\s*(\{.*?\});', re.DOTALL)
+# window.__playinfo__赋值后还跟有其他语句时，匹配到第一个分号为止
+_PLAYINFO_STMT_RE = re.compile(rb'window\.__playinfo__\s*=\s*(\{.*?\});', re.DOTALL)
+# URL中的B站视频BV号
+_BV_RE = re.compile(r'(BV[\w]+)')
+
+# B站DASH视频流id(清晰度代码)对应的清晰度名称，代码越大清晰度越高
+_BILI_DASH_QUALITIES = {
+    127: '8K',
+    126: '杜比视界',
+    125: 'HDR',
+    120: '4K',
+    116: '1080p60',
+    112: '1080p+',
+    80: '1080p',
+    74: '720p60',
+    64: '720p',
+    32: '480p',
+    16: '360p',
+    6: '240p',
+}
+
+# 清晰度代码不在上表中的视频流使用的清晰度标签
+_UNKNOWN_QUALITY = '未知'
+
+# 清晰度代码未知时按带宽估算清晰度: (带宽下限, 清晰度)
+_BANDWIDTH_QUALITY_TIERS = (
+    (2000000, '1080p+'),
+    (1000000, '1080p'),
+    (500000, '720p'),
+    (300000, '480p'),
+)
+
+# window.__INITIAL_STATE__中按清晰度描述评分，按顺序匹配第一个出现在描述中的关键字
+_DESC_QUALITY_ORDER = (
+    ('4k', 100),
+    ('2160p', 95),
+    ('2160', 95),
+    ('1440p', 90),
+    ('1080p60', 85),
+    ('1080p', 80),
+    ('720p60', 75),
+    ('720p', 70),
+    ('480p', 60),
+    ('360p', 50),
+    ('240p', 40),
+    ('144p', 30),
+)
+
+# B站处理器只需要页面中的少数标签，解析时丢弃其余节点以减少建树开销
+_BILIBILI_STRAINER = SoupStrainer(['h1', 'span', 'a', 'video'])
+
+# 边下载边解析页面时每次读取的字节数
+_STREAM_PARSE_CHUNK_SIZE = 64 * 1024
+# 可能包含媒体标签的页面类型，其他类型(如直接指向媒体文件的链接)不需要解析
+_HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'application/xml', 'text/xml')
+
+# 记录下载进度的字节间隔
+_PROGRESS_LOG_INTERVAL = 32 * 1024 * 1024
+
+# 文件名中的非法字符删除表
+_ILLEGAL_FILENAME_CHARS = str.maketrans('', '', '\\/:*?"<>|')
+# 文件名最大长度
+_MAX_FILENAME_LENGTH = 100
+
+@functools.lru_cache(maxsize=256)
+def _parse_host(url: str) -> str:
+    """解析URL的主机名（小写、不含端口），同一URL常被先爬取再下载，缓存解析结果"""
+    return urlparse(url).hostname or ''
+
+@functools.lru_cache(maxsize=8)
+def _read_cookie_txt(cookie_file: str, mtime_ns: int) -> Dict[str, str]:
+    """读取并解析 'k1=v1; k2=v2' 格式的cookie文件，以修改时间为缓存键，文件未变化时直接复用解析结果"""
+    with open(cookie_file, 'r', encoding='utf-8') as f:
+        cookie_content = f.read().strip()
+    cookies = {}
+    for cookie_pair in cookie_content.split(';'):
+        if '=' in cookie_pair:
+            key, value = cookie_pair.strip().split('=', 1)
+            cookies[key] = value
+    return cookies
+
+def _preallocate(file, size: int) -> None:
+    """按已知大小一次性为文件分配磁盘空间，避免边写边反复扩展文件"""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(file.fileno(), 0, size)
+            return
+        except OSError as e:
+            # 部分文件系统不支持fallocate，退回到仅设置文件大小
+            logger.debug(f"posix_fallocate失败: {e}")
+    file.truncate(size)
+
+def _release_page_cache(file, offset: int = 0, length: int = 0) -> None:
+    """下载的数据写入后最多被FFmpeg读取一次，提示内核将其移出页缓存（仅支持posix_fadvise的系统）"""
+    if hasattr(os, 'posix_fadvise'):
+        file.flush()
+        os.posix_fadvise(file.fileno(), offset, length, os.POSIX_FADV_DONTNEED)
+
+def _copy_to_file(source, file, progress: Optional['_DownloadProgress'] = None,
+                  length: Optional[int] = None) -> None:
+    """将响应的原始数据流写入文件，需要汇报进度时逐块写入；指定length时最多写入length字节"""
+    if length is not None:
+        while length > 0:
+            chunk = source.read(min(config.DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            file.write(chunk)
+            length -= len(chunk)
+            if progress is not None:
+                progress.advance(len(chunk))
+        return
+    if progress is None:
+        shutil.copyfileobj(source, file, length=config.DOWNLOAD_CHUNK_SIZE)
+        return
+    for chunk in iter(lambda: source.read(config.DOWNLOAD_CHUNK_SIZE), b''):
+        file.write(chunk)
+        progress.advance(len(chunk))
+
+class _DownloadProgress:
+    """汇总同一次下载中各个并发流(视频、音频及其分段)的字节进度，并回调给调用方"""
+    
+    def __init__(self, callback: Callable[[int, int], None], streams: int):
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._total = 0
+        self._done = 0
+        # 尚未登记大小的下载流数量
+        self._pending = streams
+    
+    def add_total(self, size: int) -> None:
+        """登记一个下载流的大小，大小未知时为0"""
+        with self._lock:
+            self._total += size
+            self._pending -= 1
+    
+    def advance(self, size: int) -> None:
+        """记录新下载的字节数，并以(已下载字节数, 已知总字节数)回调；回调在锁内依次执行，调用方无需再加锁
+        
+        音频请求可能因请求频率控制晚于视频开始下载，所有流的大小都登记后才回调，
+        否则按部分流的大小计算的进度会提前到达100%
+        """
+        with self._lock:
+            self._done += size
+            if self._pending <= 0:
+                self._callback(self._done, self._total)
+
+def _sniff_encoding(head: bytes) -> str:
+    """根据页面开头的BOM或<meta>声明检测编码，都没有时按UTF-8解码"""
+    _, bom_encoding = EncodingDetector.strip_byte_order_mark(head)
+    return (bom_encoding
+            or EncodingDetector.find_declared_encoding(head, is_html=True, search_entire_document=True)
+            or 'utf-8')
+
+def _iter_page_elements(response: requests.Response, tags: Tuple[str, ...]) -> Iterator[Any]:
+    """边下载边用lxml增量解析流式响应，在指定标签结束时依次产出对应元素
+    
+    调用方找到所需内容后即可停止迭代，页面剩余部分不再下载和解析；
+    响应头声明了编码时按其解码，否则由第一块数据中的BOM或<meta>检测，检测不到时按UTF-8解码
+    (lxml自身只在非ASCII文本之前遇到<meta charset>时才能识别编码，否则会按Latin-1解码)
+    """
+    declared = 'charset' in response.headers.get('content-type', '').lower()
+    parser = None
+    for chunk in response.iter_content(_STREAM_PARSE_CHUNK_SIZE):
+        if parser is None:
+            encoding = response.encoding if declared else _sniff_encoding(chunk)
+            parser = etree.HTMLPullParser(events=('end',), tag=tags, encoding=encoding)
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            yield element
+    if parser is None:
+        return
+    parser.close()
+    for _, element in parser.read_events():
+        yield element
+
+def _element_text(element: Any) -> str:
+    """获取元素及其子元素的全部文本"""
+    return ''.join(element.itertext()).strip()
+
+def _media_element_src(element: Any) -> Optional[str]:
+    """获取<video>/<audio>元素的媒体地址，优先使用自身的src，其次使用第一个带src的<source>子元素"""
+    return element.get('src') or next(
+        (source.get('src') for source in element.iter('source') if source.get('src')), None)
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_available() -> bool:
+    """检测FFmpeg是否可用，进程内只启动一次ffmpeg -version"""
+    try:
+        subprocess.run(['ffmpeg', '-version'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        return True
+    except (subprocess.SubprocessError, FileNotFoundError):
+        return False
+
+def _select_best_streams(dash: Dict[str, Any]) -> Dict[str, Any]:
+    """从B站DASH数据中选出最高清晰度的视频流和最高带宽的音频流"""
+    streams = {}
+    video_streams = dash.get('video')
+    if video_streams:
+        # DASH视频流的id即B站清晰度代码，直接查表得到清晰度；
+        # 代码越大清晰度越高，同一清晰度的不同编码按带宽区分，未知代码排在最后
+        for stream in video_streams:
+            stream_id = stream.get('id')
+            known = stream_id in _BILI_DASH_QUALITIES
+            stream['detected_quality'] = _BILI_DASH_QUALITIES[stream_id] if known else _UNKNOWN_QUALITY
+            stream['score'] = (stream_id if known else 0, stream.get('bandwidth', 0))
+        
+        # 选择评分最高的视频流（最高清晰度），只需一次线性扫描
+        selected_stream = max(video_streams, key=lambda x: x['score'])
+        bandwidth = selected_stream.get('bandwidth', 0)
+        quality_info = selected_stream['detected_quality']
+        if quality_info == _UNKNOWN_QUALITY:
+            quality_info = next((q for floor, q in _BANDWIDTH_QUALITY_TIERS if bandwidth > floor), '标清')
+        
+        streams['video_url'] = selected_stream['baseUrl']
+        streams['quality'] = quality_info
+        streams['bandwidth'] = bandwidth
+        logger.info(f"成功提取最高清晰度视频URL ({quality_info}, 带宽: {bandwidth}): {streams['video_url'][:50]}...")
+        
+        # 收集所有可用清晰度，dict.fromkeys一次遍历去重并保持原有顺序
+        available_qualities = list(dict.fromkeys(
+            q for q in (stream.get('detected_quality') for stream in video_streams)
+            if q and q != _UNKNOWN_QUALITY
+        ))
+        # 如果没有有效清晰度信息，基于带宽估算
+        streams['available_qualities'] = available_qualities or ['1080p', '720p', '480p', '标清']
+    
+    audio_streams = dash.get('audio')
+    if audio_streams:
+        # 选择最高带宽的音频流
+        best_audio = max(audio_streams, key=lambda x: x.get('bandwidth', 0))
+        streams['audio_url'] = best_audio['baseUrl']
+        streams['audio_codec'] = best_audio.get('codecs')
+        logger.info(f"成功提取最高质量音频URL: {streams['audio_url'][:50]}...")
+    return streams
+
+def _load_playinfo_dash(raw: bytes) -> Any:
+    """从playinfo的JSON原始字节中取出data.dash，不存在时返回None"""
+    if _ijson is not None:
+        # 流式解析，跳过data.dash以外的内容，不为其构建Python对象
+        return next(_ijson.items(io.BytesIO(raw), 'data.dash', use_float=True), None)
+    playinfo = _json_loads(raw)
+    data = playinfo.get('data') if isinstance(playinfo, dict) else None
+    return data.get('dash') if isinstance(data, dict) else None
+
+def _extract_from_playinfo(raw: bytes) -> Optional[Dict[str, Any]]:
+    """从window.__playinfo__中提取音视频流，数据中没有DASH信息时返回None"""
+    dash = _load_playinfo_dash(raw)
+    if not isinstance(dash, dict):
+        return None
+    return _select_best_streams(dash)
+
+def _extract_from_initial_state(raw: bytes) -> Optional[Dict[str, Any]]:
+    """从window.__INITIAL_STATE__.video.playUrlInfo中提取视频流，没有可用数据时返回None"""
+    initial_state = _json_loads(raw)
+    video = initial_state.get('video') if isinstance(initial_state, dict) else None
+    play_url_info = video.get('playUrlInfo') if isinstance(video, dict) else None
+    if not isinstance(play_url_info, list) or not play_url_info:
+        return None
+    
+    # 为每个视频流评分: 优先按清晰度描述，其次按带宽，最后按大小
+    for stream in play_url_info:
+        desc = stream.get('description', '').lower()
+        stream_score = next((score for quality, score in _DESC_QUALITY_ORDER if quality in desc), 0)
+        if stream_score == 0:
+            stream_score = stream.get('bandwidth', stream.get('size', 0))
+        stream['score'] = stream_score
+    
+    # 选择评分最高（最高清晰度）的视频流
+    selected_stream = max(play_url_info, key=lambda x: x.get('score', 0))
+    quality_info = selected_stream.get('description', '未知清晰度')
+    logger.info(f"从window.__INITIAL_STATE__.video.playUrlInfo成功提取最高清晰度视频URL ({quality_info}): {selected_stream['url'][:50]}...")
+    return {
+        'video_url': selected_stream['url'],
+        'quality': quality_info,
+        'available_qualities': [stream.get('description', '未知') for stream in play_url_info],
+    }
+
+# B站页面中可提取播放信息的变量，按优先级排列: (变量名, 匹配模式, 提取函数(参数为JSON原始字节))
+_BILI_JSON_EXTRACTORS = (
+    ('window.__playinfo__', _PLAYINFO_RE, _extract_from_playinfo),
+    ('window.__INITIAL_STATE__', _INITIAL_STATE_RE, _extract_from_initial_state),
+)
+
+def _probe_audio_codec(path: str) -> Optional[str]:
+    """使用ffprobe获取文件中第一个音频流的编码名称，无法获取时返回None"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+             '-show_entries', 'stream=codec_name', '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    except (subprocess.SubprocessError, FileNotFoundError):
+        return None
+    return result.stdout.decode('utf-8', errors='ignore').strip() or None
+
 class MediaCrawler:
     """媒体爬虫核心模块，用于爬取和下载视频、音乐内容"""
     
@@ -32,9 +350,11 @@ class MediaCrawler:
     
     def _get_site_handler(self, url: str) -> Optional[callable]:
         """根据URL获取对应的网站处理器"""
-        domain = urlparse(url).netloc.lower()
-        for site_domain, handler in self._site_handlers.items():
-            if site_domain in domain:
+        # 由完整主机名逐级去掉子域名，在处理器表中做字典查找
+        parts = _parse_host(url).split('.')
+        for i in range(len(parts) - 1):
+            handler = self._site_handlers.get('.'.join(parts[i:]))
+            if handler:
                 return handler
         return self._handle_generic  # 默认处理器
     
@@ -55,12 +375,15 @@ class MediaCrawler:
             raise
     
     def download(self, media_info: Dict[str, Any], download_path: Optional[str] = None, 
-                 download_type: str = 'both') -> Dict[str, str]:
+                 download_type: str = 'both',
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, str]:
         """下载媒体文件
         Args:
             media_info: 媒体信息字典
             download_path: 下载路径，默认为配置中的对应目录
             download_type: 下载类型，'video'、'audio'或'both'
+            progress_callback: 下载进度回调，参数为(已下载字节数, 已知总字节数)，可能在下载线程中调用；
+                指定时不使用FFmpeg直接拉流合并，保证进度能够汇报
         Returns:
             包含下载文件路径的字典
         """
@@ -99,21 +422,43 @@ class MediaCrawler:
                 'Referer': 'https://www.youtube.com/',
             }
         
-        # 下载视频
-        video_path = None
+        # 开启DIRECT_STREAM_MERGE且同时需要视频和音频时，由FFmpeg直接拉取两路流并合并，省去中间文件的写入和读取；
+        # 该方式无法汇报下载进度，调用方需要进度时改为先下载再合并
+        if (config.DIRECT_STREAM_MERGE and progress_callback is None
+                and download_type == 'both' and has_video_url and has_audio_url):
+            try:
+                result['merged'] = self._merge_remote_streams(
+                    media_info['video_url'], media_info['audio_url'], headers,
+                    download_path, media_info.get('title', 'merged_video'), media_info.get('audio_codec'))
+                logger.info(f"视频和音频已成功合并: {result['merged']}")
+                return result
+            except Exception as e:
+                logger.warning(f"FFmpeg直接合并失败，改为先下载再合并: {e}")
+        
+        # 确定需要下载的流: (类型, URL, 文件名, 扩展名)
+        streams = []
         if (media_info.get('type') == 'video' or download_type == 'video' or download_type == 'both') and has_video_url:
             # 如果是B站视频，确保original_url存在
             if 'bilibili' in source and not media_info.get('original_url'):
                 # 使用media_info中的原始URL或默认URL
                 media_info['original_url'] = media_info.get('url', 'https://www.bilibili.com')
-            video_path = self._download_file(media_info['video_url'], download_path, media_info.get('title', 'video'), 'mp4', headers)
-            result['video'] = video_path
-        
-        # 下载音频
-        audio_path = None
+            streams.append(('video', media_info['video_url'], media_info.get('title', 'video'), 'mp4'))
         if (media_info.get('type') == 'audio' or download_type == 'audio' or download_type == 'both') and has_audio_url:
-            audio_path = self._download_file(media_info['audio_url'], download_path, media_info.get('title', 'audio'), 'mp3', headers)
-            result['audio'] = audio_path
+            streams.append(('audio', media_info['audio_url'], media_info.get('title', 'audio'), 'mp3'))
+        
+        # 视频和音频是相互独立的网络流，并发下载
+        if streams:
+            progress = _DownloadProgress(progress_callback, len(streams)) if progress_callback else None
+            with ThreadPoolExecutor(max_workers=len(streams)) as executor:
+                futures = [
+                    (kind, executor.submit(self._download_file, url, download_path, filename, extension,
+                                           headers, progress))
+                    for kind, url, filename, extension in streams
+                ]
+                for kind, future in futures:
+                    result[kind] = future.result()
+        video_path = result.get('video')
+        audio_path = result.get('audio')
         
         # 如果同时下载了视频和音频，且下载类型不是分别下载，则合并它们
         if video_path and audio_path and download_type == 'both':
@@ -127,14 +472,45 @@ class MediaCrawler:
         
         return result
     
-    def _download_file(self, url: str, save_dir: str, filename: str, extension: str, headers: Optional[Dict[str, str]] = None) -> str:
-        """下载单个文件"""
+    def download_batch(self, media_infos: List[Dict[str, Any]], download_path: Optional[str] = None,
+                       download_type: str = 'both', max_workers: Optional[int] = None) -> List[Union[Dict[str, str], Exception]]:
+        """批量下载多个媒体文件（如播放列表），各媒体的下载与合并并行执行
+        Args:
+            media_infos: 媒体信息字典列表
+            download_path: 下载路径，默认为配置中的对应目录
+            download_type: 下载类型，'video'、'audio'或'both'
+            max_workers: 同时下载的媒体数，默认为配置中的最大并发下载数
+        Returns:
+            与media_infos顺序一致的结果列表，下载失败的项为对应的异常
+        """
+        if not media_infos:
+            return []
+        
+        # FFmpeg合并本身运行在独立进程中，使用线程即可并行，且共享同一请求会话和请求频率控制
+        max_workers = min(max_workers or config.MAX_CONCURRENT_DOWNLOADS, len(media_infos))
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.download, media_info, download_path, download_type)
+                       for media_info in media_infos]
+            for media_info, future in zip(media_infos, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"批量下载失败: {media_info.get('title', media_info.get('url'))}: {e}")
+                    results.append(e)
+        return results
+    
+    def _download_file(self, url: str, save_dir: str, filename: str, extension: str,
+                       headers: Optional[Dict[str, str]] = None,
+                       progress: Optional[_DownloadProgress] = None) -> str:
+        """下载单个文件，progress不为空时汇报下载进度"""
         # 清理文件名
         filename = self._sanitize_filename(filename)
         save_path = os.path.join(save_dir, f"{filename}.{extension}")
         
         logger.info(f"开始下载: {url}\n保存到: {save_path}")
         
+        response = None
         try:
             # 发送请求获取文件
             response = request_manager.get(url, stream=True, headers=headers)
@@ -142,19 +518,51 @@ class MediaCrawler:
             
             # 获取文件总大小
             total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
+            if progress is not None:
+                progress.add_total(total_size)
+            # 服务器支持范围请求且文件足够大时，改为多连接分段并行下载
+            if (config.DOWNLOAD_CONNECTIONS > 1
+                    and total_size >= config.DOWNLOAD_CONNECTIONS * config.DOWNLOAD_CHUNK_SIZE
+                    and response.headers.get('accept-ranges') == 'bytes'
+                    and not response.headers.get('content-encoding')):
+                # 分段请求沿用首个请求的请求头(User-Agent、Referer等)，cookies由会话自动附加
+                segment_headers = dict(response.request.headers)
+                segment_headers.pop('Cookie', None)
+                segment_headers['Accept-Encoding'] = 'identity'
+                # 首个请求的响应体直接作为第一段读取，只为其余分段发送范围请求，省去一次请求和连接建立
+                self._download_file_ranged(response.url, save_path, total_size, segment_headers, progress,
+                                           first_response=response)
+                logger.info(f"下载完成: {save_path}")
+                return save_path
+            
+            # 仅在服务器压缩传输时才解码，否则直接读取原始字节
+            response.raw.decode_content = bool(response.headers.get('content-encoding'))
             
             # 分块下载文件
-            with open(save_path, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=config.DOWNLOAD_CHUNK_SIZE):
-                    if chunk:
+            with open(save_path, 'wb', buffering=config.DOWNLOAD_CHUNK_SIZE) as file:
+                # 提示内核按顺序写入处理该文件（仅Linux等支持posix_fadvise的系统）
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                # 已知文件大小时预先分配空间
+                if total_size > 0:
+                    _preallocate(file, total_size)
+                if total_size > 0 and logger.isEnabledFor(logging.DEBUG):
+                    # 需要记录下载进度时逐块写入，每下载一定字节数才记录一次
+                    downloaded_size = 0
+                    next_log_size = _PROGRESS_LOG_INTERVAL
+                    for chunk in iter(lambda: response.raw.read(config.DOWNLOAD_CHUNK_SIZE), b''):
                         file.write(chunk)
                         downloaded_size += len(chunk)
-                        
-                        # 记录下载进度
-                        if total_size > 0:
-                            progress = downloaded_size / total_size * 100
-                            logger.debug(f"下载进度: {progress:.1f}%")
+                        if progress is not None:
+                            progress.advance(len(chunk))
+                        if downloaded_size >= next_log_size:
+                            next_log_size = downloaded_size + _PROGRESS_LOG_INTERVAL
+                            logger.debug(f"下载进度: {downloaded_size / total_size * 100:.1f}%")
+                else:
+                    _copy_to_file(response.raw, file, progress)
+                # 按实际写入的长度截断，避免预分配的空间超出实际内容
+                file.truncate()
+                _release_page_cache(file)
             
             logger.info(f"下载完成: {save_path}")
             return save_path
@@ -164,16 +572,66 @@ class MediaCrawler:
             if os.path.exists(save_path):
                 os.remove(save_path)
             raise
+        finally:
+            # 流式响应必须关闭，连接才能归还到会话的连接池中复用
+            if response is not None:
+                response.close()
+    
+    def _download_file_ranged(self, url: str, save_path: str, total_size: int, headers: Dict[str, str],
+                              progress: Optional[_DownloadProgress] = None,
+                              first_response: Optional[requests.Response] = None) -> None:
+        """按字节范围将文件切分为多段，使用多个连接并行下载
+        
+        first_response为已发出的完整文件请求的响应时，从其响应体读取第一段，不再为第一段单独请求
+        """
+        segment_size = -(-total_size // config.DOWNLOAD_CONNECTIONS)
+        ranges = [(start, min(start + segment_size, total_size) - 1)
+                  for start in range(0, total_size, segment_size)]
+        logger.debug(f"使用 {len(ranges)} 个连接分段下载，文件大小: {total_size} 字节")
+        
+        # 预先分配文件空间，各分段直接写入各自的偏移位置
+        with open(save_path, 'wb') as file:
+            _preallocate(file, total_size)
+        
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [
+                executor.submit(self._write_segment, first_response, save_path, start, end, progress)
+                if start == 0 and first_response is not None else
+                executor.submit(self._download_segment, url, save_path, start, end, headers, progress)
+                for start, end in ranges
+            ]
+            for future in futures:
+                future.result()
+    
+    def _download_segment(self, url: str, save_path: str, start: int, end: int, headers: Dict[str, str],
+                          progress: Optional[_DownloadProgress] = None) -> None:
+        """下载文件中 [start, end] 字节范围的分段，并写入文件的对应偏移位置"""
+        segment_headers = dict(headers, Range=f'bytes={start}-{end}')
+        response = request_manager.session.get(url, headers=segment_headers, stream=True,
+                                               timeout=request_manager.session.timeout)
+        try:
+            if response.status_code != 206:
+                raise RuntimeError(f"服务器未返回分段内容(状态码 {response.status_code})")
+            self._write_segment(response, save_path, start, end, progress)
+        finally:
+            response.close()
+    
+    def _write_segment(self, response: requests.Response, save_path: str, start: int, end: int,
+                       progress: Optional[_DownloadProgress] = None) -> None:
+        """从响应体读取 [start, end] 字节范围的分段(共end - start + 1字节)，写入文件的对应偏移位置"""
+        with open(save_path, 'r+b', buffering=config.DOWNLOAD_CHUNK_SIZE) as file:
+            file.seek(start)
+            _copy_to_file(response.raw, file, progress, end - start + 1)
+            written = file.tell() - start
+            _release_page_cache(file, start, written)
+        if written != end - start + 1:
+            raise RuntimeError(f"分段 {start}-{end} 下载不完整: {written} 字节")
+        logger.debug(f"分段下载完成: {start}-{end}")
     
     def _sanitize_filename(self, filename: str) -> str:
         """清理文件名，移除非法字符"""
-        # 移除非法字符
-        filename = re.sub(r'[\\/:*?"<>|]', '', filename)
-        # 限制文件名长度
-        max_length = 100
-        if len(filename) > max_length:
-            filename = filename[:max_length]
-        return filename
+        # 移除非法字符并限制文件名长度
+        return filename.translate(_ILLEGAL_FILENAME_CHARS)[:_MAX_FILENAME_LENGTH]
     
     def _merge_video_audio(self, video_path: str, audio_path: str, save_dir: str, title: str) -> str:
         """使用FFmpeg合并视频和音频文件
@@ -186,11 +644,7 @@ class MediaCrawler:
             合并后的文件路径
         """
         # 检查FFmpeg是否可用
-        try:
-            subprocess.run(['ffmpeg', '-version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.error("未找到FFmpeg。请先安装FFmpeg并确保它在系统PATH中。")
-            raise RuntimeError("未找到FFmpeg，请先安装它以支持视频和音频合并功能。")
+        self._ensure_ffmpeg()
         
         # 清理标题
         title = self._sanitize_filename(title)
@@ -207,21 +661,23 @@ class MediaCrawler:
         # 使用FFmpeg合并视频和音频
         try:
             # 构建FFmpeg命令
+            # 音频已是AAC时直接复制，无需重新编码
+            audio_codec = 'copy' if _probe_audio_codec(audio_path) == 'aac' else 'aac'
             cmd = [
                 'ffmpeg',
                 '-i', video_path,  # 输入视频
                 '-i', audio_path,  # 输入音频
                 '-c:v', 'copy',    # 视频编码保持不变
-                '-c:a', 'aac',     # 音频编码为AAC
-                '-strict', 'experimental',
+                '-c:a', audio_codec,  # 音频编码为AAC
+                '-threads', '0',   # 音频转码时使用全部CPU核心
                 '-y',              # 覆盖已存在的文件
                 output_path        # 输出文件
             ]
             
-            # 执行FFmpeg命令
+            # 执行FFmpeg命令，不读取的标准输出直接丢弃，避免管道写满阻塞
             subprocess.run(
                 cmd,
-                stdout=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
                 check=True
             )
@@ -235,9 +691,140 @@ class MediaCrawler:
             logger.error(f"合并过程中发生错误: {e}")
             raise
     
+    def _merge_remote_streams(self, video_url: str, audio_url: str, headers: Dict[str, str],
+                              save_dir: str, title: str, audio_codec: Optional[str] = None) -> str:
+        """由FFmpeg直接拉取远程视频流和音频流并合并，不落地中间文件
+        Args:
+            video_url: 视频流URL
+            audio_url: 音频流URL
+            headers: 拉取流时附加的请求头(如B站所需的Referer)
+            save_dir: 保存目录
+            title: 视频标题
+            audio_codec: 音频流的编码(如DASH中的mp4a.40.2)，已知为AAC时直接复制
+        Returns:
+            合并后的文件路径
+        """
+        self._ensure_ffmpeg()
+        
+        output_path = os.path.normpath(os.path.join(save_dir, f"{self._sanitize_filename(title)}_merged.mp4"))
+        
+        # 两路流由FFmpeg自行请求，同样需要经过robots.txt检查和请求频率控制，并携带会话cookies
+        video_options = self._ffmpeg_input_options(video_url, headers)
+        audio_options = self._ffmpeg_input_options(audio_url, headers)
+        # 音频已是AAC时直接复制，无需重新编码
+        audio_codec = 'copy' if (audio_codec or '').lower().startswith(('mp4a', 'aac')) else 'aac'
+        
+        logger.info(f"开始由FFmpeg直接拉取并合并视频和音频:\n输出: {output_path}")
+        cmd = [
+            'ffmpeg',
+            *video_options, '-i', video_url,  # 输入视频流
+            *audio_options, '-i', audio_url,  # 输入音频流
+            '-map', '0:v:0',
+            '-map', '1:a:0',
+            '-c:v', 'copy',    # 视频编码保持不变
+            '-c:a', audio_codec,  # 音频编码为AAC
+            '-threads', '0',   # 音频转码时使用全部CPU核心
+            '-y',              # 覆盖已存在的文件
+            output_path        # 输出文件
+        ]
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+        except subprocess.CalledProcessError as e:
+            # 删除不完整的输出文件
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise RuntimeError(f"FFmpeg执行失败: {e.stderr.decode('utf-8', errors='ignore')[-500:]}")
+        return output_path
+    
+    def _ffmpeg_input_options(self, url: str, headers: Dict[str, str]) -> List[str]:
+        """生成FFmpeg拉取URL时使用的输入选项，请求头由request_manager按get的规则准备"""
+        request_headers = request_manager.prepare_external_request(url, headers)
+        # 传输编码和连接由FFmpeg自行处理
+        for name in ('Accept-Encoding', 'Connection'):
+            request_headers.pop(name, None)
+        # FFmpeg的-headers参数要求每个请求头以CRLF结尾，且需放在对应的-i之前
+        header_text = ''.join(f"{key}: {value}\r\n" for key, value in request_headers.items())
+        return ['-headers', header_text, '-rw_timeout', '30000000',
+                # 连接中断时由FFmpeg重连，最长等待时间与请求重试的退避上限一致
+                '-reconnect', '1', '-reconnect_streamed', '1',
+                '-reconnect_delay_max', str(config.MAX_BACKOFF)]
+    
+    def _ensure_ffmpeg(self) -> None:
+        """检查FFmpeg是否可用，不可用时抛出RuntimeError"""
+        if not _ffmpeg_available():
+            logger.error("未找到FFmpeg。请先安装FFmpeg并确保它在系统PATH中。")
+            raise RuntimeError("未找到FFmpeg，请先安装它以支持视频和音频合并功能。")
+    
     # 网站特定处理器
+    def _extract_with_ytdlp(self, url: str, source: str) -> Optional[Dict[str, Any]]:
+        """使用yt-dlp(可选依赖)提取媒体信息，未安装或提取失败时返回None，由调用方回退到自带的解析逻辑"""
+        try:
+            from yt_dlp import YoutubeDL
+        except ImportError:
+            return None
+        
+        # yt-dlp自行发送请求，需要先检查robots.txt规则
+        if not robots_checker.can_fetch(url):
+            logger.warning(f"根据robots.txt规则，不允许爬取 {url}")
+            return None
+        
+        ydl_options = {
+            'format': 'bestvideo+bestaudio/best',
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+        }
+        # 复用B站cookie文件，以便获取登录后才能访问的清晰度
+        if source == 'bilibili':
+            cookie_file = os.path.join(config.COOKIES_DIR, 'bilibili.txt')
+            try:
+                ydl_options['http_headers'] = {'Cookie': '; '.join(
+                    f"{key}={value}" for key, value in
+                    _read_cookie_txt(cookie_file, os.stat(cookie_file).st_mtime_ns).items())}
+            except FileNotFoundError:
+                logger.debug(f"未找到B站cookie文件，yt-dlp将以未登录状态提取: {cookie_file}")
+        
+        try:
+            with YoutubeDL(ydl_options) as ydl:
+                info = ydl.extract_info(url, download=False)
+        except Exception as e:
+            logger.warning(f"yt-dlp提取失败，改用内置解析: {e}")
+            return None
+        
+        # bestvideo+bestaudio时分别给出视频流和音频流，否则为单个音视频合一的流
+        video_url = audio_url = audio_codec = None
+        for fmt in info.get('requested_formats') or ():
+            if fmt.get('vcodec', 'none') != 'none':
+                video_url = video_url or fmt.get('url')
+            elif fmt.get('acodec', 'none') != 'none' and not audio_url:
+                audio_url = fmt.get('url')
+                audio_codec = fmt.get('acodec')
+        if not video_url and not audio_url:
+            video_url = info.get('url')
+        
+        logger.info(f"yt-dlp成功提取媒体信息: {info.get('title')} ({info.get('format')})")
+        return {
+            'type': 'video',
+            'title': info.get('title') or f'{source} video',
+            'author': info.get('uploader') or 'Unknown',
+            'duration': info.get('duration'),
+            'views': info.get('view_count'),
+            'video_url': video_url,
+            'audio_url': audio_url,
+            'audio_codec': audio_codec,
+            'thumbnail_url': info.get('thumbnail'),
+            'quality': info.get('format_note') or info.get('resolution'),
+            'source': source,
+            'original_url': url,
+        }
+    
     def _handle_youtube(self, url: str) -> Dict[str, Any]:
         """处理YouTube视频"""
+        # 优先使用yt-dlp提取
+        media_info = self._extract_with_ytdlp(url, 'youtube')
+        if media_info:
+            return media_info
+        
         try:
             from pytube import YouTube
             
@@ -271,32 +858,33 @@ class MediaCrawler:
     
     def _handle_bilibili(self, url: str) -> Dict[str, Any]:
         """处理Bilibili视频"""
+        # 优先使用yt-dlp提取
+        media_info = self._extract_with_ytdlp(url, 'bilibili')
+        if media_info:
+            return media_info
+        
         try:
             # 尝试加载B站cookie文件（txt格式）
             cookie_file = os.path.join(config.COOKIES_DIR, 'bilibili.txt')
-            if os.path.exists(cookie_file):
+            try:
+                mtime_ns = os.stat(cookie_file).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+                logger.warning(f"未找到B站cookie文件: {cookie_file}")
+            if mtime_ns is not None:
                 try:
-                    with open(cookie_file, 'r', encoding='utf-8') as f:
-                        cookie_content = f.read().strip()
-                        if cookie_content:
-                            # 解析cookie字符串并设置到请求管理器
-                            cookies = {}
-                            for cookie_pair in cookie_content.split(';'):
-                                if '=' in cookie_pair:
-                                    key, value = cookie_pair.strip().split('=', 1)
-                                    cookies[key] = value
-                            request_manager.set_cookies(cookies)
-                            logger.info(f"成功加载B站cookie文件: {cookie_file}")
+                    # 解析cookie字符串并设置到请求管理器，文件未修改时复用上次的解析结果
+                    cookies = _read_cookie_txt(cookie_file, mtime_ns)
+                    if cookies:
+                        request_manager.set_cookies(cookies)
+                        logger.info(f"成功加载B站cookie文件: {cookie_file}")
                 except Exception as e:
                     logger.error(f"加载B站cookie文件失败: {e}")
-            else:
-                logger.warning(f"未找到B站cookie文件: {cookie_file}")
             
             # 发送请求获取页面内容
             response = request_manager.get(url)
-            # 明确指定编码为UTF-8，避免中文乱码
-            response.encoding = 'utf-8'
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # 使用C实现的lxml解析原始字节，明确指定编码为UTF-8，避免中文乱码
+            soup = BeautifulSoup(response.content, 'lxml', from_encoding='utf-8', parse_only=_BILIBILI_STRAINER)
             
             # 提取视频标题
             title = soup.find('h1', class_='video-title')
@@ -323,266 +911,39 @@ class MediaCrawler:
             
             # 方法1: 尝试直接找到视频标签
             video_tag = soup.find('video')
+            # 只查找带src属性的source标签，避免缺少属性时抛出KeyError而整体回退到通用处理
+            source_tag = video_tag.find('source', src=True) if video_tag else None
             if video_tag and video_tag.get('src'):
                 video_info['video_url'] = video_tag['src']
                 logger.info(f"方法1: 找到直接视频URL: {video_info['video_url']}")
-            elif video_tag and video_tag.find('source'):
-                video_info['video_url'] = video_tag.find('source')['src']
+            elif source_tag:
+                video_info['video_url'] = source_tag['src']
                 logger.info(f"方法1: 找到视频source标签URL: {video_info['video_url']}")
             else:
-                # 方法2: 尝试从页面中查找window.__playinfo__变量
-                logger.debug("尝试方法2: 查找window.__playinfo__变量")
-                scripts = soup.find_all('script')
+                # 方法2/3: 依次用正则从页面源码中提取播放信息JSON，
+                # 优先使用window.__playinfo__，因为它通常能提供更高质量的视频流
+                html = response.content
                 found_playinfo = False
-                
-                for script in scripts:
-                    if script.string:
-                        # 尝试多种可能的格式来提取playinfo
-                        if 'window.__playinfo__' in script.string:
-                            try:
-                                # 提取window.__playinfo__变量内容
-                                playinfo_part = script.string.split('window.__playinfo__=')[1].split('</script>')[0]
-                                # 移除末尾可能的分号和空格
-                                while playinfo_part and playinfo_part[-1] in [';', ' ', '\n', '\r']:
-                                    playinfo_part = playinfo_part[:-1]
-                                
-                                logger.debug(f"提取到的playinfo_part: {playinfo_part[:100]}...")
-                                playinfo = json.loads(playinfo_part)
-                                
-                                # 提取视频和音频URL
-                                if isinstance(playinfo, dict) and 'data' in playinfo and 'dash' in playinfo['data']:
-                                    dash = playinfo['data']['dash']
-                                    
-                                    # 处理视频流 - 选择最高清晰度
-                                    if 'video' in dash and dash['video']:
-                                        # 按清晰度排序视频流（从高到低）
-                                        # 清晰度通常在description或codecs字段中
-                                        video_streams = dash['video']
-                                        
-                                        # 定义清晰度优先级
-                                        quality_order = {
-                                            '4K': 100,
-                                            '2160p': 95,
-                                            '2160': 95,
-                                            '1440p': 90,
-                                            '1080p60': 85,
-                                            '1080p': 80,
-                                            '720p60': 75,
-                                            '720p': 70,
-                                            '480p': 60,
-                                            '360p': 50,
-                                            '240p': 40,
-                                            '144p': 30
-                                        }
-                                        
-                                        # 为每个视频流评分
-                                        for stream in video_streams:
-                                            stream_score = 0
-                                            stream_description = '未知'
-                                            
-                                            # 尝试多种方式识别清晰度
-                                            # 1. 检查description字段
-                                            if 'description' in stream:
-                                                try:
-                                                    desc = str(stream['description']).lower()
-                                                    stream_description = stream['description']
-                                                    for quality, score in quality_order.items():
-                                                        if quality.lower() in desc:
-                                                            stream_score = score
-                                                            break
-                                                except:
-                                                    pass
-                                            
-                                            # 2. 检查codecs字段
-                                            if stream_score == 0 and 'codecs' in stream:
-                                                try:
-                                                    codecs = str(stream['codecs']).lower()
-                                                    # 从codecs中提取分辨率相关信息
-                                                    for quality, score in quality_order.items():
-                                                        if quality.lower() in codecs:
-                                                            stream_score = score
-                                                            break
-                                                except:
-                                                    pass
-                                            
-                                            # 3. 检查其他可能包含分辨率的字段
-                                            if stream_score == 0:
-                                                # 检查bandwidth
-                                                if 'bandwidth' in stream:
-                                                    stream_score = stream['bandwidth']
-                                                # 检查size
-                                                elif 'size' in stream:
-                                                    stream_score = stream['size']
-                                                # 检查id字段或其他可能包含分辨率信息的字段
-                                                elif 'id' in stream:
-                                                    try:
-                                                        id_str = str(stream['id']).lower()
-                                                        for quality, score in quality_order.items():
-                                                            if quality.lower() in id_str:
-                                                                stream_score = score
-                                                                break
-                                                    except:
-                                                        pass
-                                            
-                                            # 添加额外分数，确保dash格式优先
-                                            if 'baseUrl' in stream and '.m4s' in stream['baseUrl']:
-                                                stream_score += 1000  # dash格式通常质量更高
-                                            
-                                            stream['score'] = stream_score
-                                            stream['detected_quality'] = stream_description
-                                        
-                                        # 按评分排序，选择最高评分的视频流
-                                        sorted_video_streams = sorted(video_streams, key=lambda x: x.get('score', 0), reverse=True)
-                                        
-                                        # 选择第一个视频流（最高清晰度）
-                                        video_info['video_url'] = sorted_video_streams[0]['baseUrl']
-                                        
-                                        # 记录选择的视频清晰度信息
-                                        selected_stream = sorted_video_streams[0]
-                                        quality_info = selected_stream.get('detected_quality', '未知清晰度')
-                                        
-                                        # 如果description是乱码，尝试从URL或其他字段推断清晰度
-                                        if not quality_info or quality_info == '未知' or '鏈煡' in quality_info:
-                                            video_url = selected_stream.get('baseUrl', '')
-                                            # 从URL中提取清晰度信息
-                                            if '30080' in video_url:  # 常见的1080p高质量编码
-                                                quality_info = '1080p'
-                                                stream_score = 80
-                                            elif '16' in video_url:  # 可能是低质量编码
-                                                quality_info = '低清晰度'
-                                                stream_score = 30
-                                            else:
-                                                # 根据带宽估算清晰度
-                                                bandwidth = selected_stream.get('bandwidth', 0)
-                                                if bandwidth > 2000000:
-                                                    quality_info = '1080p+'
-                                                    stream_score = 90
-                                                elif bandwidth > 1000000:
-                                                    quality_info = '1080p'
-                                                    stream_score = 80
-                                                elif bandwidth > 500000:
-                                                    quality_info = '720p'
-                                                    stream_score = 70
-                                                elif bandwidth > 300000:
-                                                    quality_info = '480p'
-                                                    stream_score = 60
-                                                else:
-                                                    quality_info = '标清'
-                                                    stream_score = 50
-                                        
-                                        logger.info(f"成功提取最高清晰度视频URL ({quality_info}, 带宽: {selected_stream.get('bandwidth', 0)}): {video_info['video_url'][:50]}...")
-                                        
-                                        # 添加清晰度信息到media_info
-                                        video_info['quality'] = quality_info
-                                        video_info['bandwidth'] = selected_stream.get('bandwidth', 0)
-                                        # 收集所有可用清晰度，去除重复值
-                                        available_qualities = []
-                                        for stream in video_streams:
-                                            q = stream.get('detected_quality', '未知')
-                                            if q not in available_qualities and q and '鏈煡' not in q:
-                                                available_qualities.append(q)
-                                        # 如果没有有效清晰度信息，基于带宽估算
-                                        if not available_qualities:
-                                            available_qualities = ['1080p', '720p', '480p', '标清']
-                                        video_info['available_qualities'] = available_qualities
-                                    
-                                    # 处理音频流 - 选择最高质量
-                                    if 'audio' in dash and dash['audio']:
-                                        audio_streams = dash['audio']
-                                        # 按带宽排序，选择最高带宽的音频流
-                                        sorted_audio_streams = sorted(audio_streams, key=lambda x: x.get('bandwidth', 0), reverse=True)
-                                        video_info['audio_url'] = sorted_audio_streams[0]['baseUrl']
-                                        logger.info(f"成功提取最高质量音频URL: {video_info['audio_url'][:50]}...")
-                                    
-                                    found_playinfo = True
-                                    break
-                            except Exception as e:
-                                logger.debug(f"解析window.__playinfo__失败: {e}")
-                                continue
-                        
-                        # 方法3: 只有在方法2失败时才尝试查找其他可能包含视频信息的变量名
-                        # 优先使用方法2，因为它通常能提供更高质量的视频流
-                        if not found_playinfo and ('window.__INITIAL_STATE__' in script.string or 'window.playerConfig' in script.string):
-                            try:
-                                logger.debug("尝试方法3: 查找其他可能的视频信息变量")
-                                # 使用正则表达式提取完整的window.__INITIAL_STATE__变量
-                                if 'window.__INITIAL_STATE__' in script.string:
-                                    # 查找模式：window.__INITIAL_STATE__ = {json内容};
-                                    pattern = r'window\.__INITIAL_STATE__\s*=\s*({.*?});'
-                                    match = re.search(pattern, script.string, re.DOTALL)
-                                    
-                                    if match:
-                                        initial_state_json = match.group(1)
-                                        logger.debug(f"提取到的window.__INITIAL_STATE__ JSON长度: {len(initial_state_json)}字符")
-                                        
-                                        # 尝试解析JSON
-                                        initial_state = json.loads(initial_state_json)
-                                        
-                                        # 检查是否有video对象和playUrlInfo字段
-                                        if 'video' in initial_state and 'playUrlInfo' in initial_state['video']:
-                                            play_url_info = initial_state['video']['playUrlInfo']
-                                            if isinstance(play_url_info, list) and len(play_url_info) > 0:
-                                                # 定义清晰度优先级
-                                                quality_order = {
-                                                    '4K': 100,
-                                                    '2160p': 95,
-                                                    '2160': 95,
-                                                    '1440p': 90,
-                                                    '1080p60': 85,
-                                                    '1080p': 80,
-                                                    '720p60': 75,
-                                                    '720p': 70,
-                                                    '480p': 60,
-                                                    '360p': 50,
-                                                    '240p': 40,
-                                                    '144p': 30
-                                                }
-                                                 
-                                                # 为每个视频流评分
-                                                for stream in play_url_info:
-                                                    stream_score = 0
-                                                    # 检查清晰度相关字段
-                                                    if 'description' in stream:
-                                                        desc = stream['description'].lower()
-                                                        for quality, score in quality_order.items():
-                                                            if quality.lower() in desc:
-                                                                stream_score = score
-                                                                break
-                                                    # 检查bandwidth
-                                                    if stream_score == 0 and 'bandwidth' in stream:
-                                                        stream_score = stream['bandwidth']
-                                                    # 检查size作为备选评分指标
-                                                    elif stream_score == 0 and 'size' in stream:
-                                                        stream_score = stream['size']
-                                                    
-                                                    stream['score'] = stream_score
-                                                 
-                                                # 按评分排序，选择最高评分的视频流
-                                                sorted_video_streams = sorted(play_url_info, key=lambda x: x.get('score', 0), reverse=True)
-                                                
-                                                # 选择最高清晰度的视频流
-                                                video_info['video_url'] = sorted_video_streams[0]['url']
-                                                
-                                                # 记录选择的视频清晰度信息
-                                                selected_stream = sorted_video_streams[0]
-                                                quality_info = selected_stream.get('description', '未知清晰度')
-                                                logger.info(f"方法3: 从window.__INITIAL_STATE__.video.playUrlInfo成功提取最高清晰度视频URL ({quality_info}): {video_info['video_url'][:50]}...")
-                                                
-                                                # 添加清晰度信息到media_info
-                                                video_info['quality'] = quality_info
-                                                video_info['available_qualities'] = [stream.get('description', '未知') for stream in play_url_info]
-                                                
-                                                found_playinfo = True
-                                                break
-                            except Exception as e:
-                                logger.debug(f"解析其他变量失败: {e}")
-                                continue
+                for var_name, pattern, extractor in _BILI_JSON_EXTRACTORS:
+                    match = pattern.search(html)
+                    if not match:
+                        continue
+                    logger.debug(f"找到{var_name}变量，JSON长度: {len(match.group(1))}字节")
+                    try:
+                        streams = extractor(match.group(1))
+                    except Exception as e:
+                        logger.debug(f"解析{var_name}失败: {e}")
+                        continue
+                    if streams is not None:
+                        video_info.update(streams)
+                        found_playinfo = True
+                        break
                 
                 # 方法4: 直接使用B站API接口(需要BV号)
                 if not found_playinfo:
                     logger.debug("尝试方法4: 使用B站API接口")
                     # 从URL中提取BV号
-                    bv_match = re.search(r'(BV[\w]+)', url)
+                    bv_match = _BV_RE.search(url)
                     if bv_match:
                         bv_id = bv_match.group(1)
                         api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bv_id}"
@@ -603,33 +964,17 @@ class MediaCrawler:
             
             # 尝试通过不同方法提取视频URL
             if 'video_url' not in video_info:
-                # 1. 尝试从页面中的<script>标签提取更多信息
-                try:
-                    # 搜索包含视频信息的脚本标签
-                    for script in soup.find_all('script'):
-                        if script.string and 'window.__playinfo__' in script.string:
-                            logger.debug("找到window.__playinfo__脚本，尝试提取视频信息")
-                            try:
-                                # 尝试解析脚本内容
-                                script_content = script.string
-                                playinfo_start = script_content.find('window.__playinfo__=') + len('window.__playinfo__=')
-                                playinfo_end = script_content.find(';', playinfo_start)
-                                if playinfo_start > -1 and playinfo_end > playinfo_start:
-                                    playinfo_data = json.loads(script_content[playinfo_start:playinfo_end])
-                                    # 检查是否有视频数据
-                                    if 'data' in playinfo_data and 'dash' in playinfo_data['data']:
-                                        dash_data = playinfo_data['data']['dash']
-                                        if 'video' in dash_data and len(dash_data['video']) > 0:
-                                            # 选择第一个视频流
-                                            video_info['video_url'] = dash_data['video'][0]['baseUrl']
-                                        if 'audio' in dash_data and len(dash_data['audio']) > 0:
-                                            # 选择第一个音频流
-                                            video_info['audio_url'] = dash_data['audio'][0]['baseUrl']
-                                    break
-                            except Exception as inner_e:
-                                logger.debug(f"解析window.__playinfo__失败: {inner_e}")
-                except Exception as e:
-                    logger.debug(f"提取<script>标签信息失败: {e}")
+                # 1. 尝试匹配后面还跟有其他语句的window.__playinfo__赋值，直接扫描原始字节，无需逐个解码<script>标签
+                match = _PLAYINFO_STMT_RE.search(response.content)
+                if match:
+                    logger.debug("找到window.__playinfo__语句，尝试提取视频信息")
+                    try:
+                        # 与方法2使用同一套解析和清晰度选择逻辑
+                        streams = _extract_from_playinfo(match.group(1))
+                        if streams:
+                            video_info.update(streams)
+                    except Exception as e:
+                        logger.debug(f"解析window.__playinfo__失败: {e}")
                 
                 # 2. 如果还是没有找到URL，提供明确的错误提示
                 if 'video_url' not in video_info:
@@ -655,18 +1000,26 @@ class MediaCrawler:
     def _handle_soundcloud(self, url: str) -> Dict[str, Any]:
         """处理SoundCloud音频"""
         try:
-            # 发送请求获取页面内容
-            response = request_manager.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取音频标题
-            title = soup.find('h1').text.strip() if soup.find('h1') else 'SoundCloud Audio'
+            # 发送请求，边下载边解析页面内容，找到标题和作者后即停止
+            response = request_manager.get(url, stream=True)
+            h1_text = author = None
+            try:
+                for element in _iter_page_elements(response, ('h1', 'span')):
+                    if element.tag == 'h1':
+                        if h1_text is None:
+                            h1_text = _element_text(element)
+                    elif author is None and element.get('itemprop') == 'author':
+                        author = _element_text(element)
+                    if h1_text is not None and author is not None:
+                        break
+            finally:
+                response.close()
             
             # 提取音频信息
             audio_info = {
                 'type': 'audio',
-                'title': title,
-                'author': soup.find('span', itemprop='author').text.strip() if soup.find('span', itemprop='author') else 'Unknown',
+                'title': h1_text if h1_text is not None else 'SoundCloud Audio',
+                'author': author if author is not None else 'Unknown',
                 'source': 'soundcloud'
             }
             
@@ -682,46 +1035,51 @@ class MediaCrawler:
     def _handle_generic(self, url: str) -> Dict[str, Any]:
         """通用处理器，尝试从任何网站提取媒体信息"""
         try:
-            # 发送请求获取页面内容
-            response = request_manager.get(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取标题
-            title = soup.title.text.strip() if soup.title else 'Unknown Media'
-            
-            # 尝试查找视频和音频标签
-            video_tags = soup.find_all('video')
-            audio_tags = soup.find_all('audio')
-            
             media_info = {
                 'type': 'unknown',
-                'title': title,
+                'title': 'Unknown Media',
                 'source': urlparse(url).netloc,
                 'video_url': None,
                 'audio_url': None
             }
+            title = None
+            has_video = has_audio = False
             
-            # 尝试提取第一个视频源
-            if video_tags:
-                media_info['type'] = 'video'
-                for video in video_tags:
-                    if video.get('src'):
-                        media_info['video_url'] = video['src']
-                        break
-                    elif video.find('source'):
-                        media_info['video_url'] = video.find('source')['src']
+            # 发送请求，边下载边解析页面内容，标题和第一个视频、音频源都找到后即停止
+            response = request_manager.get(url, stream=True)
+            try:
+                # 响应不是HTML页面时不可能包含媒体标签，不再下载和解析响应体
+                content_type = response.headers.get('content-type', '').lower()
+                if content_type and not content_type.startswith(_HTML_CONTENT_TYPES):
+                    logger.debug(f"响应类型为{content_type}，跳过页面解析: {url}")
+                    elements = ()
+                else:
+                    elements = _iter_page_elements(response, ('title', 'video', 'audio'))
+                for element in elements:
+                    if element.tag == 'title':
+                        if title is None:
+                            title = _element_text(element)
+                    elif element.tag == 'video':
+                        has_video = True
+                        # 提取第一个视频源
+                        if media_info['video_url'] is None:
+                            media_info['video_url'] = _media_element_src(element)
+                    else:
+                        has_audio = True
+                        # 提取第一个音频源
+                        if media_info['audio_url'] is None:
+                            media_info['audio_url'] = _media_element_src(element)
+                    if title is not None and media_info['video_url'] and media_info['audio_url']:
                         break
+            finally:
+                response.close()
             
-            # 尝试提取第一个音频源
-            if audio_tags:
+            if title is not None:
+                media_info['title'] = title
+            if has_video:
+                media_info['type'] = 'video'
+            if has_audio:
                 media_info['type'] = 'audio'
-                for audio in audio_tags:
-                    if audio.get('src'):
-                        media_info['audio_url'] = audio['src']
-                        break
-                    elif audio.find('source'):
-                        media_info['audio_url'] = audio.find('source')['src']
-                        break
             
             return media_info
         except Exception as e:
@@ -0,0 +1,66 @@
+import json
+import time
+import sqlite3
+import threading
+import logging
+from urllib.parse import urldefrag
+from typing import Dict, Any, Optional
+from config.config import config
+
+# 配置日志
+logging.basicConfig(level=config.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+class MetadataCache:
+    """媒体信息的磁盘缓存，按URL保存爬取结果，有效期内重复爬取同一URL时无需再发送网络请求"""
+
+    def __init__(self, db_path: str, ttl: float):
+        self._ttl = ttl
+        # 爬取在多个线程中并发进行，共用一个连接并用锁串行化访问
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS media_info ('
+                'url TEXT PRIMARY KEY, created_at REAL NOT NULL, data TEXT NOT NULL)'
+            )
+
+    @staticmethod
+    def _key(url: str) -> str:
+        """URL片段(#之后的部分)不影响页面内容，去掉后作为缓存键"""
+        return urldefrag(url.strip())[0]
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """获取URL的缓存媒体信息，不存在或已过期时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT created_at, data FROM media_info WHERE url = ?', (self._key(url),)
+            ).fetchone()
+        if row is None or time.time() - row[0] > self._ttl:
+            return None
+        try:
+            return json.loads(row[1])
+        except ValueError as e:
+            logger.debug(f"缓存的媒体信息已损坏: {url}: {e}")
+            return None
+
+    def set(self, url: str, media_info: Dict[str, Any]) -> None:
+        """保存URL的媒体信息"""
+        try:
+            data = json.dumps(media_info, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.debug(f"媒体信息无法序列化，不写入缓存: {url}: {e}")
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO media_info (url, created_at, data) VALUES (?, ?, ?)',
+                (self._key(url), time.time(), data)
+            )
+
+    def clear(self) -> None:
+        """清除所有缓存"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM media_info')
+
+# 导出全局实例
+metadata_cache = MetadataCache(config.METADATA_CACHE_FILE, config.METADATA_CACHE_TTL_SECONDS)
\ No newline at end of file
@@ -1,27 +1,49 @@
+import os
+import json
 import time
 import random
-from typing import Dict, Any, Optional, Union
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, Union
+from urllib.parse import urlparse
 from fake_useragent import UserAgent
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 from config.config import config
 from src.robots_checker import robots_checker
-import time
 
 # 配置日志
 logging.basicConfig(level=config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+# User-Agent池的随机数生成器
+_UA_RNG = random.Random()
+# 预先从fake_useragent取出的User-Agent数量
+_UA_POOL_SIZE = 128
+
 class RequestManager:
     """HTTP请求管理器，处理请求发送、重试、反爬等机制"""
     
     def __init__(self):
         self.session = requests.Session()
-        self.user_agent = UserAgent()
+        robots_checker.set_session(self.session)
+        # fake_useragent初始化开销较大，首次需要随机User-Agent时才创建并预取一批User-Agent，
+        # 之后每次请求只需从池中随机选取
+        self.user_agent: Optional[UserAgent] = None
+        self._ua_pool: Optional[Tuple[str, ...]] = None
         self._setup_session()
         self.request_count = {}
+        # 每个域名一把锁，保证同一域名的请求计数和请求间隔正确，不同域名之间互不阻塞
+        self._domain_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
         # 测试URL标记，用于跳过robots.txt检查
         self.test_domains = ['example.com']
+        # 测试域名及其子域名的匹配表，按后缀锚定匹配
+        self._test_hosts = frozenset(self.test_domains)
+        self._test_host_suffixes = tuple('.' + domain for domain in self.test_domains)
         
     def _setup_session(self) -> None:
         """设置会话参数"""
@@ -34,27 +56,49 @@ class RequestManager:
         })
         # 设置请求超时
         self.session.timeout = 30
+        # 扩大每个主机的连接池，保证并发下载(音视频并行、分段下载、批量下载)的连接都能复用
+        pool_maxsize = config.MAX_CONCURRENT_DOWNLOADS * 2 * config.DOWNLOAD_CONNECTIONS
+        adapter = HTTPAdapter(pool_connections=config.MAX_CONCURRENT_REQUESTS * 2, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def _random_user_agent(self) -> str:
         """生成随机User-Agent"""
+        if self._ua_pool is None:
+            self._ua_pool = self._build_ua_pool()
+        return _UA_RNG.choice(self._ua_pool)
+    
+    def _build_ua_pool(self) -> Tuple[str, ...]:
+        """从fake_useragent预取一批不重复的User-Agent，失败时使用预定义的User-Agent"""
         try:
-            return self.user_agent.random
-        except Exception:
-            # 如果fake_useragent失败，使用预定义的User-Agent
-            return random.choice(config.USER_AGENTS)
-    
-    def _check_rate_limit(self, url: str) -> None:
-        """检查并控制请求频率"""
-        base_url = requests.utils.urlparse(url).netloc
-        
+            if self.user_agent is None:
+                self.user_agent = UserAgent()
+            pool = tuple(set(self.user_agent.random for _ in range(_UA_POOL_SIZE)))
+            if pool:
+                return pool
+        except Exception as e:
+            logger.debug(f"fake_useragent不可用，使用预定义的User-Agent: {e}")
+        return tuple(config.USER_AGENTS)
+    
+    def _check_rate_limit(self, base_url: str, url: str) -> None:
+        """检查并控制请求频率，base_url为调用方已解析出的URL域名部分"""
+        with self._locks_lock:
+            domain_lock = self._domain_locks.get(base_url)
+            if domain_lock is None:
+                domain_lock = self._domain_locks[base_url] = threading.Lock()
+        with domain_lock:
+            self._wait_for_rate_limit(base_url, url)
+    
+    def _wait_for_rate_limit(self, base_url: str, url: str) -> None:
+        """更新域名请求计数并等待到允许发送请求的时间"""
         # 检查是否为测试URL，如果是则跳过请求频率检查
-        if any(test_domain in base_url for test_domain in self.test_domains):
+        if self._is_test_domain(base_url):
             logger.debug(f"跳过测试URL的请求频率检查: {url}")
             return
             
         # 记录每个域名的请求次数
         if base_url not in self.request_count:
-            self.request_count[base_url] = {'count': 0, 'last_request': time.time()}
+            self.request_count[base_url] = {'count': 0, 'last_request': time.monotonic()}
         
         # 检查每个域名的最大爬取页数限制
         self.request_count[base_url]['count'] += 1
@@ -63,7 +107,7 @@ class RequestManager:
             raise Exception(f"已达到域名 {base_url} 的最大爬取页数限制")
         
         # 计算需要等待的时间
-        current_time = time.time()
+        current_time = time.monotonic()
         elapsed = current_time - self.request_count[base_url]['last_request']
         
         # 获取robots.txt中的爬取延迟建议
@@ -82,7 +126,22 @@ class RequestManager:
             time.sleep(total_wait)
         
         # 更新最后请求时间
-        self.request_count[base_url]['last_request'] = time.time()
+        self.request_count[base_url]['last_request'] = time.monotonic()
+    
+    def _is_test_domain(self, base_url: str) -> bool:
+        """判断URL的域名部分是否为测试域名或其子域名"""
+        host = base_url.partition(':')[0].lower()
+        return host in self._test_hosts or host.endswith(self._test_host_suffixes)
+    
+    def prewarm(self, url: str) -> None:
+        """预先获取URL所在网站的robots.txt，提前完成DNS解析和TCP/TLS握手，
+        建立的连接留在连接池中，随后的正式请求可直接复用"""
+        if self._is_test_domain(urlparse(url).netloc):
+            return
+        try:
+            robots_checker.can_fetch(url)
+        except Exception as e:
+            logger.debug(f"预热连接失败: {url}: {e}")
     
     def get(self, url: str, params: Optional[Dict[str, Any]] = None, 
             headers: Optional[Dict[str, str]] = None, 
@@ -90,57 +149,8 @@ class RequestManager:
             allow_redirects: bool = True, 
             **kwargs) -> requests.Response:
         """发送GET请求"""
-        # 检查是否为测试URL，如果是则跳过robots.txt检查
-        base_url = requests.utils.urlparse(url).netloc
-        if not any(test_domain in base_url for test_domain in self.test_domains):
-            # 检查robots.txt规则
-            if not robots_checker.can_fetch(url):
-                logger.warning(f"根据robots.txt规则，不允许爬取 {url}")
-                raise Exception(f"根据robots.txt规则，不允许爬取 {url}")
-        else:
-            logger.debug(f"跳过测试URL的robots.txt检查: {url}")
-        
-        # 检查请求频率
-        self._check_rate_limit(url)
-        
-        # 准备请求头
-        request_headers = self.session.headers.copy()
-        request_headers['User-Agent'] = self._random_user_agent()
-        
-        if headers:
-            request_headers.update(headers)
-        
-        # 准备请求参数
-        request_kwargs = {
-            'params': params,
-            'headers': request_headers,
-            'cookies': cookies,
-            'allow_redirects': allow_redirects,
-        }
-        request_kwargs.update(kwargs)
-        
-        # 发送请求并处理重试
-        retry_count = 0
-        while retry_count <= config.MAX_RETRY:
-            try:
-                logger.debug(f"发送GET请求到 {url}")
-                response = self.session.get(url, **request_kwargs)
-                
-                # 检查响应状态
-                response.raise_for_status()
-                return response
-            except requests.exceptions.RequestException as e:
-                retry_count += 1
-                logger.warning(f"请求失败 ({retry_count}/{config.MAX_RETRY}): {e}")
-                
-                if retry_count > config.MAX_RETRY:
-                    logger.error(f"达到最大重试次数，请求失败: {url}")
-                    raise
-                
-                # 指数退避
-                backoff_time = (2 ** retry_count) + random.uniform(0, 1)
-                logger.debug(f"{backoff_time:.2f}秒后重试...")
-                time.sleep(backoff_time)
+        return self._request('GET', url, headers=headers, params=params, cookies=cookies,
+                             allow_redirects=allow_redirects, **kwargs)
     
     def post(self, url: str, data: Optional[Dict[str, Any]] = None, 
              json: Optional[Dict[str, Any]] = None, 
@@ -150,43 +160,37 @@ class RequestManager:
              allow_redirects: bool = True, 
              **kwargs) -> requests.Response:
         """发送POST请求"""
-        # 检查robots.txt规则
-        if not robots_checker.can_fetch(url):
-            logger.warning(f"根据robots.txt规则，不允许爬取 {url}")
-            raise Exception(f"根据robots.txt规则，不允许爬取 {url}")
+        return self._request('POST', url, headers=headers, data=data, json=json, params=params,
+                             cookies=cookies, allow_redirects=allow_redirects, **kwargs)
+    
+    def _request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                 **kwargs) -> requests.Response:
+        """发送请求，统一处理robots.txt检查、请求频率控制和失败重试"""
+        base_url = urlparse(url).netloc
+        self._check_robots(base_url, url)
         
         # 检查请求频率
-        self._check_rate_limit(url)
+        self._check_rate_limit(base_url, url)
         
-        # 准备请求头
-        request_headers = self.session.headers.copy()
-        request_headers['User-Agent'] = self._random_user_agent()
-        
-        if headers:
-            request_headers.update(headers)
-        
-        # 准备请求参数
-        request_kwargs = {
-            'data': data,
-            'json': json,
-            'params': params,
-            'headers': request_headers,
-            'cookies': cookies,
-            'allow_redirects': allow_redirects,
-        }
-        request_kwargs.update(kwargs)
+        # 准备请求头，会话的默认请求头由requests在发送时自动合并，无需每次复制；
+        # 调用方已指定User-Agent时不再生成随机User-Agent
+        request_headers = self._with_user_agent(headers)
         
         # 发送请求并处理重试
         retry_count = 0
-        while retry_count <= config.MAX_RETRY:
+        while True:
             try:
-                logger.debug(f"发送POST请求到 {url}")
-                response = self.session.post(url, **request_kwargs)
+                logger.debug(f"发送{method}请求到 {url}")
+                response = self.session.request(method, url, headers=request_headers, **kwargs)
                 
                 # 检查响应状态
                 response.raise_for_status()
                 return response
             except requests.exceptions.RequestException as e:
+                if not self._is_retryable(e):
+                    logger.error(f"请求失败且不可重试: {url}: {e}")
+                    raise
+                
                 retry_count += 1
                 logger.warning(f"请求失败 ({retry_count}/{config.MAX_RETRY}): {e}")
                 
@@ -194,30 +198,94 @@ class RequestManager:
                     logger.error(f"达到最大重试次数，请求失败: {url}")
                     raise
                 
-                # 指数退避
-                backoff_time = (2 ** retry_count) + random.uniform(0, 1)
+                # 指数退避，等待时间设有上限；429响应带有Retry-After时按服务器要求的时间等待
+                backoff_time = min(self._retry_after(e) or 2 ** retry_count, config.MAX_BACKOFF) + random.random()
                 logger.debug(f"{backoff_time:.2f}秒后重试...")
                 time.sleep(backoff_time)
     
+    def _check_robots(self, base_url: str, url: str) -> None:
+        """检查robots.txt规则，不允许爬取时抛出异常"""
+        # 检查是否为测试URL，如果是则跳过robots.txt检查
+        if self._is_test_domain(base_url):
+            logger.debug(f"跳过测试URL的robots.txt检查: {url}")
+            return
+        if not robots_checker.can_fetch(url):
+            logger.warning(f"根据robots.txt规则，不允许爬取 {url}")
+            raise Exception(f"根据robots.txt规则，不允许爬取 {url}")
+    
+    def _with_user_agent(self, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """复制请求头，调用方未指定User-Agent时加上随机User-Agent"""
+        request_headers = dict(headers) if headers else {}
+        if not any(key.lower() == 'user-agent' for key in request_headers):
+            request_headers['User-Agent'] = self._random_user_agent()
+        return request_headers
+    
+    def prepare_external_request(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """为交由外部程序(如FFmpeg)发送的GET请求执行与get相同的robots.txt检查和请求频率控制，
+        并返回该请求应携带的完整请求头(会话默认请求头、会话中对应域名的cookies及User-Agent)
+        
+        外部程序自行处理重试，不计入本管理器的重试次数
+        """
+        base_url = urlparse(url).netloc
+        self._check_robots(base_url, url)
+        self._check_rate_limit(base_url, url)
+        prepared = self.session.prepare_request(
+            requests.Request('GET', url, headers=self._with_user_agent(headers)))
+        return dict(prepared.headers)
+    
+    @staticmethod
+    def _is_retryable(error: requests.exceptions.RequestException) -> bool:
+        """判断请求错误是否值得重试: 连接错误、超时、5xx及429可重试，其余4xx等错误重试也不会成功"""
+        if isinstance(error, requests.exceptions.HTTPError):
+            status_code = error.response.status_code if error.response is not None else 0
+            return status_code >= 500 or status_code == 429
+        return isinstance(error, (requests.exceptions.ConnectionError,
+                                  requests.exceptions.Timeout,
+                                  requests.exceptions.ChunkedEncodingError))
+    
+    @staticmethod
+    def _retry_after(error: requests.exceptions.RequestException) -> Optional[float]:
+        """获取429响应中Retry-After头指定的等待秒数，没有或不是秒数格式时返回None"""
+        response = getattr(error, 'response', None)
+        if response is None or response.status_code != 429:
+            return None
+        try:
+            return max(0.0, float(response.headers.get('Retry-After', '')))
+        except ValueError:
+            return None
+    
     def set_cookies(self, cookies: Dict[str, str]) -> None:
         """设置会话cookie"""
-        for key, value in cookies.items():
-            self.session.cookies.set(key, value)
+        self.session.cookies.update(cookies)
+    
+    def remove_cookies(self, names) -> None:
+        """从会话中移除指定名称的cookie"""
+        for name in names:
+            requests.cookies.remove_cookie_by_name(self.session.cookies, name)
     
     def save_cookies(self, filename: str) -> None:
-        """保存会话cookie到文件"""
-        import pickle
-        cookie_path = config.COOKIES_DIR / filename if hasattr(config.COOKIES_DIR, 'joinpath') else f"{config.COOKIES_DIR}/{filename}"
-        with open(cookie_path, 'wb') as f:
-            pickle.dump(self.session.cookies, f)
+        """保存会话cookie到文件(JSON格式)，先写入临时文件再替换，避免写入中断时损坏原文件"""
+        cookie_path = os.path.join(config.COOKIES_DIR, filename)
+        # 保留域名和路径，避免不同网站的同名cookie相互覆盖
+        cookies = [
+            {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+             'path': cookie.path, 'secure': cookie.secure, 'expires': cookie.expires}
+            for cookie in self.session.cookies
+        ]
+        tmp_path = cookie_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cookies, f, ensure_ascii=False)
+        os.replace(tmp_path, cookie_path)
     
     def load_cookies(self, filename: str) -> bool:
         """从文件加载会话cookie"""
-        import pickle
-        cookie_path = config.COOKIES_DIR / filename if hasattr(config.COOKIES_DIR, 'joinpath') else f"{config.COOKIES_DIR}/{filename}"
+        cookie_path = os.path.join(config.COOKIES_DIR, filename)
         try:
-            with open(cookie_path, 'rb') as f:
-                self.session.cookies.update(pickle.load(f))
+            with open(cookie_path, 'r', encoding='utf-8') as f:
+                cookies = json.load(f)
+            for cookie in cookies:
+                self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'],
+                                         path=cookie['path'], secure=cookie['secure'], expires=cookie['expires'])
             return True
         except Exception as e:
             logger.error(f"加载cookie失败: {e}")
@@ -227,6 +295,32 @@ class RequestManager:
         """清除会话状态"""
         self.session = requests.Session()
         self._setup_session()
+        robots_checker.set_session(self.session)
+
+class AsyncRequestManager:
+    """RequestManager的asyncio接口，请求在线程池中执行，不同域名的请求可以并发进行
+    
+    robots.txt检查、按域名的请求频率控制和重试仍由同步的RequestManager负责，
+    同一域名的请求依旧按顺序间隔发送
+    """
+    
+    def __init__(self, manager: RequestManager, max_concurrency: int = config.MAX_CONCURRENT_REQUESTS):
+        self._manager = manager
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='async-request')
+    
+    async def _run(self, func, *args, **kwargs) -> requests.Response:
+        """在线程池中执行同步请求"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def get(self, url: str, **kwargs) -> requests.Response:
+        """异步发送GET请求，参数同RequestManager.get"""
+        return await self._run(self._manager.get, url, **kwargs)
+    
+    async def post(self, url: str, **kwargs) -> requests.Response:
+        """异步发送POST请求，参数同RequestManager.post"""
+        return await self._run(self._manager.post, url, **kwargs)
 
 # 导出全局实例
-request_manager = RequestManager()
\ No newline at end of file
+request_manager = RequestManager()
+async_request_manager = AsyncRequestManager(request_manager)
\ No newline at end of file
@@ -1,5 +1,8 @@
+import time
+import threading
 import requests
 from urllib.parse import urlparse, urljoin
+from urllib.robotparser import RobotFileParser
 from typing import Dict, Any, Optional
 import logging
 from config.config import config
@@ -8,12 +11,28 @@ from config.config import config
 logging.basicConfig(level=config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+# 每个网站最多缓存的URL爬取权限判断结果数
+_MAX_CACHED_DECISIONS = 4096
+# 获取robots.txt时最多跟随的重定向次数
+_MAX_ROBOTS_REDIRECTS = 5
+
 class RobotsChecker:
     """robots.txt规则检查器，用于确保爬虫行为合规"""
     
     def __init__(self):
+        # 缓存结构: {base_url: {'parser': 解析器或None, 'etag': ETag, 'last_modified': Last-Modified,
+        #                     'expires_at': 过期时间, 'decisions': {url: 是否允许爬取}}}
         self._cache: Dict[str, Dict[str, Any]] = {}
+        self._cache_lock = threading.Lock()
         self._user_agent = "DeepSuckBot/1.0 (complying with robots.txt)"
+        # 复用连接获取各网站的robots.txt，避免每次都重新建立TCP/TLS连接；
+        # request_manager会换成它自己的会话，使robots.txt与后续页面请求共用同一连接池；
+        # 请求不经过会话的cookies，避免把用户登录后保存的cookies发送给robots.txt
+        self._session = requests.Session()
+        
+    def set_session(self, session: requests.Session) -> None:
+        """设置获取robots.txt使用的会话(仅复用其连接池，不发送会话中的cookies)"""
+        self._session = session
         
     def get_base_url(self, url: str) -> str:
         """提取URL的基础部分"""
@@ -22,19 +41,18 @@ class RobotsChecker:
     
     def fetch_robots_txt(self, base_url: str) -> Optional[str]:
         """获取网站的robots.txt内容"""
-        if base_url in self._cache and 'robots_txt' in self._cache[base_url]:
-            return self._cache[base_url]['robots_txt']
-        
+        response = self._request_robots_txt(base_url)
+        return response.text if response is not None and response.status_code == 200 else None
+    
+    def _request_robots_txt(self, base_url: str, headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """请求网站的robots.txt，返回200或304响应，不存在或出错时返回None"""
         robots_url = urljoin(base_url, '/robots.txt')
+        # 获取robots.txt时始终使用爬虫自身的User-Agent标识
+        headers = dict(headers or {}, **{'User-Agent': self._user_agent})
         try:
-            response = requests.get(robots_url, timeout=10)
-            if response.status_code == 200:
-                robots_txt = response.text
-                # 缓存robots.txt内容
-                if base_url not in self._cache:
-                    self._cache[base_url] = {}
-                self._cache[base_url]['robots_txt'] = robots_txt
-                return robots_txt
+            response = self._send_without_cookies(robots_url, headers)
+            if response.status_code in (200, 304):
+                return response
             else:
                 logger.info(f"未找到robots.txt文件: {robots_url}")
                 # 如果没有robots.txt，假设允许爬取
@@ -44,93 +62,102 @@ class RobotsChecker:
             # 出错时也假设允许爬取
             return None
     
+    def _send_without_cookies(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """通过会话的连接池发送GET请求，但不附加会话的cookies和默认请求头；
+        会话自动跟随重定向时会重新合并cookies，因此由这里逐次跟随"""
+        for _ in range(_MAX_ROBOTS_REDIRECTS + 1):
+            request = requests.Request('GET', url, headers=headers).prepare()
+            # 与Session.request一致，沿用环境变量中的代理和证书设置
+            settings = self._session.merge_environment_settings(request.url, {}, None, None, None)
+            response = self._session.send(request, allow_redirects=False, timeout=10, **settings)
+            if not response.is_redirect:
+                break
+            url = urljoin(response.url, response.headers['location'])
+            response.close()
+        return response
+    
+    def _get_parser(self, base_url: str) -> Optional[RobotFileParser]:
+        """获取网站robots.txt的解析器，缓存有效期内不再重新获取，没有robots.txt时返回None"""
+        return self._get_entry(base_url)['parser']
+    
+    def _get_entry(self, base_url: str) -> Dict[str, Any]:
+        """获取网站robots.txt的缓存项，缓存过期或不存在时重新获取"""
+        entry = self._cache.get(base_url)
+        if entry and entry['expires_at'] > time.monotonic():
+            return entry
+        
+        # 缓存过期后带上验证信息重新请求，robots.txt未变化时服务器只返回304
+        headers = {}
+        if entry and entry['parser'] is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        response = self._request_robots_txt(base_url, headers)
+        
+        if response is not None and response.status_code == 304 and headers:
+            # 内容未变化，沿用已解析的规则，只延长有效期
+            logger.debug(f"robots.txt未变化: {base_url}")
+            new_entry = dict(entry, expires_at=time.monotonic() + config.ROBOTS_TTL_SECONDS)
+        elif response is not None and response.status_code == 200:
+            # 使用标准库解析robots.txt，正确处理User-agent分组及Allow/Disallow的优先级
+            parser = RobotFileParser(urljoin(base_url, '/robots.txt'))
+            parser.parse(response.text.splitlines())
+            new_entry = {
+                'parser': parser,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'expires_at': time.monotonic() + config.ROBOTS_TTL_SECONDS,
+                'decisions': {},
+            }
+        else:
+            # 不存在或获取失败的结果也缓存一段较短的时间，避免每次请求都重新获取
+            new_entry = {'parser': None, 'expires_at': time.monotonic() + config.ROBOTS_NEG_TTL_SECONDS}
+        
+        # 缓存解析结果
+        with self._cache_lock:
+            self._cache[base_url] = new_entry
+        return new_entry
+    
     def can_fetch(self, url: str) -> bool:
         """检查是否可以爬取指定URL"""
         if not config.ROBOTS_TXT_ENABLED:
             logger.debug("robots.txt检查已禁用")
             return True
         
-        base_url = self.get_base_url(url)
-        robots_txt = self.fetch_robots_txt(base_url)
+        entry = self._get_entry(self.get_base_url(url))
         
-        # 如果没有robots.txt或检查被禁用，默认允许
-        if not robots_txt:
+        # 如果没有robots.txt，默认允许
+        if entry['parser'] is None:
             return True
         
-        # 解析robots.txt并检查是否允许爬取
-        # 这里实现一个简化版的robots.txt解析器
-        # 完整实现应当处理User-agent和Disallow规则的优先级
-        allowed = True
-        user_agent_section = False
-        
-        for line in robots_txt.splitlines():
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            if line.lower().startswith('user-agent:'):
-                user_agent = line.split(':', 1)[1].strip().lower()
-                # 检查是否匹配我们的User-agent或通配符
-                if user_agent == '*' or self._user_agent.lower().startswith(user_agent):
-                    user_agent_section = True
-                else:
-                    user_agent_section = False
-            elif line.lower().startswith('disallow:') and user_agent_section:
-                disallow_path = line.split(':', 1)[1].strip()
-                # 如果Disallow路径为空，表示允许所有
-                if not disallow_path:
-                    continue
-                # 检查URL是否匹配Disallow路径
-                if url.startswith(urljoin(base_url, disallow_path)):
-                    allowed = False
-                    break
-            elif line.lower().startswith('allow:') and user_agent_section:
-                allow_path = line.split(':', 1)[1].strip()
-                # 检查URL是否匹配Allow路径（覆盖Disallow）
-                if url.startswith(urljoin(base_url, allow_path)):
-                    allowed = True
-                    break
-        
+        # 同一URL的判断结果在规则有效期内不变，直接复用，避免每次都逐条匹配规则
+        # (robots.txt未变化(304)时沿用原缓存项，判断结果随之保留)
+        decisions = entry['decisions']
+        allowed = decisions.get(url)
+        if allowed is None:
+            allowed = entry['parser'].can_fetch(self._user_agent, url)
+            if len(decisions) < _MAX_CACHED_DECISIONS:
+                decisions[url] = allowed
         logger.debug(f"URL {url} 爬取权限: {allowed}")
         return allowed
     
     def get_crawl_delay(self, url: str) -> Optional[float]:
         """获取网站推荐的爬取延迟"""
-        base_url = self.get_base_url(url)
-        robots_txt = self.fetch_robots_txt(base_url)
+        parser = self._get_parser(self.get_base_url(url))
         
-        if not robots_txt:
+        if parser is None:
             return None
         
-        user_agent_section = False
-        
-        for line in robots_txt.splitlines():
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            if line.lower().startswith('user-agent:'):
-                user_agent = line.split(':', 1)[1].strip().lower()
-                if user_agent == '*' or self._user_agent.lower().startswith(user_agent):
-                    user_agent_section = True
-                else:
-                    user_agent_section = False
-            elif line.lower().startswith('crawl-delay:') and user_agent_section:
-                try:
-                    delay = float(line.split(':', 1)[1].strip())
-                    return delay
-                except ValueError:
-                    pass
-        
-        return None
+        return parser.crawl_delay(self._user_agent)
     
     def clear_cache(self, base_url: Optional[str] = None) -> None:
         """清除缓存"""
-        if base_url:
-            if base_url in self._cache:
-                del self._cache[base_url]
-        else:
-            self._cache.clear()
+        with self._cache_lock:
+            if base_url:
+                self._cache.pop(base_url, None)
+            else:
+                self._cache.clear()
 
 # 导出全局实例
 robots_checker = RobotsChecker()
\ No newline at end of file
@@ -1,94 +1,202 @@
 import sys
 import os
+import json
 import logging
-import threading
-from typing import Dict, Any
+import collections
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QLabel, QLineEdit, QPushButton, QTextEdit, QComboBox, QFileDialog, 
-    QCheckBox, QProgressBar, QGroupBox, QMessageBox, QGridLayout
+    QLabel, QLineEdit, QPushButton, QTextEdit, QPlainTextEdit, QComboBox, QFileDialog, 
+    QCheckBox, QProgressBar, QGroupBox, QMessageBox, QGridLayout, QSpinBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QIcon, QFont
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThread, QThreadPool, QTimer, pyqtSignal
 from config.config import config
-from src.media_crawler import media_crawler
-from src.login_manager import login_manager
+from src.request_manager import request_manager
+from src.metadata_cache import metadata_cache
 
 # 配置日志
 logging.basicConfig(level=config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
-class CrawlerThread(QThread):
-    """爬虫线程，用于在后台执行爬取任务"""
-    # 定义信号
+# 可选使用orjson序列化媒体信息中嵌套的字典和列表，未安装时回退到标准库
+try:
+    import orjson
+    
+    def _json_dumps(value: Any) -> str:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS, default=str).decode('utf-8')
+except ImportError:
+    def _json_dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+class WorkerSignals(QObject):
+    """后台任务的信号集合，QRunnable不是QObject，无法直接定义和发送信号
+    
+    后台任务只通过这些信号与界面交互，信号以队列方式投递到界面线程，
+    任务之间不共享可变状态，因此在自由线程解释器上无需额外加锁即可并行执行
+    """
     progress_update = pyqtSignal(int)
     log_message = pyqtSignal(str)
     crawl_complete = pyqtSignal(dict)
+    crawl_finished = pyqtSignal()
+    download_complete = pyqtSignal(dict)
+    login_complete = pyqtSignal(bool)
     error_occurred = pyqtSignal(str)
+
+class CrawlerWorker(QRunnable):
+    """爬取任务，提交到线程池后在后台执行，多个URL时并发爬取"""
     
-    def __init__(self, url: str):
+    def __init__(self, urls: List[str], max_workers: int = config.MAX_CONCURRENT_CRAWLS,
+                 force_refresh: bool = False):
         super().__init__()
-        self.url = url
+        self.urls = urls
+        self.max_workers = max_workers
+        self.force_refresh = force_refresh
+        self.signals = WorkerSignals()
+        # 被新的爬取任务取代后设置，不再发送结果，尚未开始的URL也不再爬取
+        self._cancelled = False
+    
+    def cancel(self):
+        """取消任务，正在进行的网络请求会继续完成，但结果被丢弃"""
+        self._cancelled = True
     
     def run(self):
-        """线程运行函数"""
+        """任务运行函数"""
         try:
-            self.log_message.emit(f"开始爬取: {self.url}")
-            self.progress_update.emit(20)
+            if len(self.urls) == 1:
+                self._crawl_one(self.urls[0])
+            else:
+                self._crawl_many()
+        finally:
+            self.signals.crawl_finished.emit()
+    
+    def _crawl_one(self, url: str):
+        """爬取单个URL"""
+        try:
+            self._emit(self.signals.log_message, f"开始爬取: {url}")
+            self._emit(self.signals.progress_update, 20)
             
             # 执行爬取
-            media_info = media_crawler.crawl(self.url)
+            media_info = self._crawl(url)
             
-            self.progress_update.emit(100)
-            self.log_message.emit(f"爬取完成: {media_info.get('title', '未知媒体')}")
+            self._emit(self.signals.progress_update, 100)
+            self._emit(self.signals.log_message, f"爬取完成: {media_info.get('title', '未知媒体')}")
             
             # 发送完成信号
-            self.crawl_complete.emit(media_info)
+            self._emit(self.signals.crawl_complete, media_info)
         except Exception as e:
             error_msg = f"爬取失败: {str(e)}"
-            self.log_message.emit(error_msg)
-            self.error_occurred.emit(error_msg)
+            self._emit(self.signals.log_message, error_msg)
+            self._emit(self.signals.error_occurred, error_msg)
+    
+    def _emit(self, signal, *args):
+        """任务未被取消时才发送信号，取消后的日志、进度、结果和错误一律丢弃；
+        crawl_finished仍直接发送，界面据此判断任务结束"""
+        if not self._cancelled:
+            signal.emit(*args)
+    
+    def _crawl(self, url: str) -> Dict[str, Any]:
+        """爬取URL的媒体信息，缓存有效期内直接使用缓存结果"""
+        if not self.force_refresh:
+            media_info = metadata_cache.get(url)
+            if media_info is not None:
+                self._emit(self.signals.log_message, f"使用缓存的媒体信息: {url}")
+                return media_info
+        
+        # 爬虫模块依赖的HTML解析库等较重，首次爬取时才导入，不拖慢界面启动
+        from src.media_crawler import media_crawler
+        media_info = media_crawler.crawl(url)
+        # 需要登录的结果不完整，不写入缓存，登录后重新爬取即可拿到完整信息
+        if not media_info.get('login_required'):
+            metadata_cache.set(url, media_info)
+        return media_info
+    
+    def _crawl_many(self):
+        """并发爬取多个URL，网络请求是瓶颈，多个请求同时进行可成倍缩短总耗时；
+        同一域名的请求仍由request_manager按间隔依次发送"""
+        total = len(self.urls)
+        self._emit(self.signals.log_message, f"开始批量爬取 {total} 个URL")
+        failed = 0
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+            futures = {executor.submit(self._crawl, url): url for url in self.urls}
+            for done, future in enumerate(as_completed(futures), 1):
+                if self._cancelled:
+                    # 取消尚未开始的爬取，已开始的等待其结束
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                url = futures[future]
+                try:
+                    media_info = future.result()
+                    self._emit(self.signals.log_message, f"爬取完成: {media_info.get('title', '未知媒体')} ({url})")
+                    self._emit(self.signals.crawl_complete, media_info)
+                except Exception as e:
+                    failed += 1
+                    self._emit(self.signals.log_message, f"爬取失败: {url}: {str(e)}")
+                self._emit(self.signals.progress_update, done * 100 // total)
+        
+        # 被取代时界面已记录取消日志，这里不再发送任何信号
+        self._emit(self.signals.log_message, f"批量爬取结束: 成功 {total - failed} 个，失败 {failed} 个")
+        if failed == total:
+            self._emit(self.signals.error_occurred, f"爬取失败: {total} 个URL全部爬取失败")
 
-class DownloadThread(QThread):
-    """下载线程，用于在后台执行下载任务"""
-    # 定义信号
-    progress_update = pyqtSignal(int)
-    log_message = pyqtSignal(str)
-    download_complete = pyqtSignal(dict)
-    error_occurred = pyqtSignal(str)
+class DownloadWorker(QRunnable):
+    """下载任务，提交到线程池后在后台执行"""
     
     def __init__(self, media_info: Dict[str, Any], download_path: str, download_type: str):
         super().__init__()
         self.media_info = media_info
         self.download_path = download_path
         self.download_type = download_type
+        self.signals = WorkerSignals()
+        self._last_percent = 0
     
     def run(self):
-        """线程运行函数"""
+        """任务运行函数"""
         try:
-            self.log_message.emit(f"开始下载: {self.media_info.get('title', '未知媒体')}")
+            self.signals.log_message.emit(f"开始下载: {self.media_info.get('title', '未知媒体')}")
             
             # 执行下载
-            result = media_crawler.download(self.media_info, self.download_path, self.download_type)
+            from src.media_crawler import media_crawler
+            result = media_crawler.download(self.media_info, self.download_path, self.download_type,
+                                            progress_callback=self._report_progress)
             
-            self.progress_update.emit(100)
+            self.signals.progress_update.emit(100)
             
             # 记录下载结果
             for media_type, path in result.items():
-                self.log_message.emit(f"{media_type} 下载完成: {path}")
+                self.signals.log_message.emit(f"{media_type} 下载完成: {path}")
             
             # 发送完成信号
-            self.download_complete.emit(result)
+            self.signals.download_complete.emit(result)
         except Exception as e:
             error_msg = f"下载失败: {str(e)}"
-            self.log_message.emit(error_msg)
-            self.error_occurred.emit(error_msg)
+            self.signals.log_message.emit(error_msg)
+            self.signals.error_occurred.emit(error_msg)
 
-class LoginThread(QThread):
-    """登录线程，用于在后台执行登录任务"""
-    # 定义信号
-    log_message = pyqtSignal(str)
-    login_complete = pyqtSignal(bool)
+    def _report_progress(self, downloaded: int, total: int):
+        """下载进度回调，百分比增加时才发送信号，避免频繁刷新进度条"""
+        if total <= 0:
+            return
+        percent = min(downloaded * 100 // total, 99)
+        if percent > self._last_percent:
+            self._last_percent = percent
+            self.signals.progress_update.emit(percent)
+
+class PrewarmWorker(QRunnable):
+    """连接预热任务，在用户点击爬取前提前获取各网站的robots.txt并建立连接"""
+    
+    def __init__(self, urls: List[str]):
+        super().__init__()
+        self.urls = urls
+    
+    def run(self):
+        """任务运行函数"""
+        for url in self.urls:
+            request_manager.prewarm(url)
+
+class LoginWorker(QRunnable):
+    """登录任务，提交到线程池后在后台执行"""
     
     def __init__(self, url: str, username: str, password: str, manual: bool):
         super().__init__()
@@ -96,13 +204,15 @@ class LoginThread(QThread):
         self.username = username
         self.password = password
         self.manual = manual
+        self.signals = WorkerSignals()
     
     def run(self):
-        """线程运行函数"""
+        """任务运行函数"""
         try:
-            self.log_message.emit(f"开始登录: {self.url}")
+            self.signals.log_message.emit(f"开始登录: {self.url}")
             
-            # 执行登录
+            # 执行登录，登录模块首次登录时才导入
+            from src.login_manager import login_manager
             success = login_manager.login(
                 self.url, 
                 self.username if self.username else None, 
@@ -112,16 +222,34 @@ class LoginThread(QThread):
             )
             
             if success:
-                self.log_message.emit("登录成功")
+                self.signals.log_message.emit("登录成功")
             else:
-                self.log_message.emit("登录失败")
+                self.signals.log_message.emit("登录失败")
             
             # 发送完成信号
-            self.login_complete.emit(success)
+            self.signals.login_complete.emit(success)
         except Exception as e:
             error_msg = f"登录异常: {str(e)}"
-            self.log_message.emit(error_msg)
-            self.login_complete.emit(False)
+            self.signals.log_message.emit(error_msg)
+            self.signals.login_complete.emit(False)
+
+def _format_media_value(value: Any) -> Any:
+    """嵌套的字典和列表一次性序列化为JSON显示，其余值直接显示"""
+    if isinstance(value, (dict, list)):
+        return _json_dumps(value)
+    return value
+
+# 是否运行在关闭了GIL的自由线程(PEP 703)解释器上，旧版本解释器没有sys._is_gil_enabled
+_GIL_ENABLED = getattr(sys, '_is_gil_enabled', lambda: True)()
+
+# 下载类型下拉框的选项及其对应的下载类型，两者按下标一一对应
+_DL_TYPE_LABELS = ("两者都下载", "仅视频", "仅音频")
+_DL_TYPES = ('both', 'video', 'audio')
+
+# 日志区域合并刷新的间隔(毫秒)
+_LOG_FLUSH_INTERVAL_MS = 50
+# 进度条合并刷新的间隔(毫秒)，约每秒30次
+_PROGRESS_FLUSH_INTERVAL_MS = 33
 
 class MediaCrawlerUI(QMainWindow):
     """媒体爬虫用户界面"""
@@ -130,6 +258,30 @@ class MediaCrawlerUI(QMainWindow):
         super().__init__()
         # 保存当前爬取的媒体信息
         self.current_media_info = None
+        # 爬取、下载和登录任务共用一个线程池，复用线程而不是每次点击都新建线程
+        self.pool = QThreadPool.globalInstance()
+        self.pool.setMaxThreadCount(min(32, QThread.idealThreadCount() * 2))
+        # 下载任务使用单独的线程池，同时下载数可在界面中调整，不会占满爬取任务的线程
+        self.download_pool = QThreadPool(self)
+        self.download_pool.setMaxThreadCount(config.MAX_CONCURRENT_DOWNLOADS)
+        # 已确认存在的下载路径，同一路径只需检查创建一次
+        self._verified_dirs = set()
+        # 正在进行的爬取任务，再次点击爬取时由新任务取代
+        self._crawl_worker = None
+        if not _GIL_ENABLED:
+            logger.info("当前解释器已关闭GIL，后台任务中的页面解析等Python代码将并行执行")
+        # 日志先写入缓冲区，由定时器合并后一次性追加到日志区域，避免每条日志都重绘一次界面
+        self._log_buffer = collections.deque()
+        self._log_timer = QTimer(self)
+        self._log_timer.setSingleShot(True)
+        self._log_timer.setInterval(_LOG_FLUSH_INTERVAL_MS)
+        self._log_timer.timeout.connect(self._flush_log)
+        # 进度同样先记录最新值，由定时器合并后刷新进度条，连续的多次进度更新只重绘一次
+        self._pending_progress = None
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setSingleShot(True)
+        self._progress_timer.setInterval(_PROGRESS_FLUSH_INTERVAL_MS)
+        self._progress_timer.timeout.connect(self._flush_progress)
         # 初始化UI
         self.init_ui()
     
@@ -152,9 +304,11 @@ class MediaCrawlerUI(QMainWindow):
         
         self.url_label = QLabel("目标URL:")
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("请输入视频或音乐的URL...")
+        self.url_input.setPlaceholderText("请输入视频或音乐的URL，多个URL用空格分隔...")
         self.crawl_button = QPushButton("爬取")
         self.crawl_button.clicked.connect(self.start_crawl)
+        # 输入完URL后立即在后台预热连接
+        self.url_input.editingFinished.connect(self.prewarm_urls)
         
         url_layout.addWidget(self.url_label)
         url_layout.addWidget(self.url_input, 1)  # 占据剩余空间
@@ -163,13 +317,13 @@ class MediaCrawlerUI(QMainWindow):
         url_group.setLayout(url_layout)
         
         # 创建选项区域
-        options_group = QGroupBox("选项设置")
+        self.options_group = QGroupBox("选项设置")
         options_layout = QGridLayout()
         
         # 下载类型选择
         self.download_type_label = QLabel("下载类型:")
         self.download_type_combo = QComboBox()
-        self.download_type_combo.addItems(["两者都下载", "仅视频", "仅音频"])
+        self.download_type_combo.addItems(_DL_TYPE_LABELS)
         
         # 下载路径选择
         self.download_path_label = QLabel("下载路径:")
@@ -182,6 +336,17 @@ class MediaCrawlerUI(QMainWindow):
         self.login_checkbox.stateChanged.connect(self.toggle_login_fields)
         self.manual_login_checkbox = QCheckBox("手动登录")
         
+        # 强制刷新选项，忽略缓存的媒体信息重新爬取
+        self.force_refresh_checkbox = QCheckBox("强制刷新")
+        
+        # 自动下载选项，每个URL爬取完成后立即开始下载，不必等待手动点击
+        self.auto_download_checkbox = QCheckBox("爬取后自动下载")
+        self.download_workers_label = QLabel("同时下载数:")
+        self.download_workers_spin = QSpinBox()
+        self.download_workers_spin.setRange(1, 16)
+        self.download_workers_spin.setValue(self.download_pool.maxThreadCount())
+        self.download_workers_spin.valueChanged.connect(self.download_pool.setMaxThreadCount)
+        
         # 用户名和密码输入
         self.username_label = QLabel("用户名:")
         self.username_input = QLineEdit()
@@ -206,9 +371,14 @@ class MediaCrawlerUI(QMainWindow):
         options_layout.addWidget(self.password_label, 2, 2)
         options_layout.addWidget(self.password_input, 2, 3)
         
+        options_layout.addWidget(self.force_refresh_checkbox, 3, 0)
+        options_layout.addWidget(self.auto_download_checkbox, 3, 1)
         options_layout.addWidget(self.login_button, 3, 3)
         
-        options_group.setLayout(options_layout)
+        options_layout.addWidget(self.download_workers_label, 4, 0)
+        options_layout.addWidget(self.download_workers_spin, 4, 1)
+        
+        self.options_group.setLayout(options_layout)
         
         # 初始隐藏登录字段
         self.toggle_login_fields()
@@ -222,8 +392,10 @@ class MediaCrawlerUI(QMainWindow):
         log_group = QGroupBox("日志输出")
         log_layout = QVBoxLayout()
         
-        self.log_text = QTextEdit()
+        # 日志只需纯文本，使用按行布局、开销更小的QPlainTextEdit，并限制保留的行数避免内存持续增长
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(config.LOG_MAX_LINES)
         
         log_layout.addWidget(self.log_text)
         log_group.setLayout(log_layout)
@@ -247,26 +419,28 @@ class MediaCrawlerUI(QMainWindow):
         
         # 将所有组件添加到主布局
         main_layout.addWidget(url_group)
-        main_layout.addWidget(options_group)
+        main_layout.addWidget(self.options_group)
         main_layout.addWidget(self.progress_bar)
         main_layout.addWidget(log_group, 1)  # 占据剩余空间
         main_layout.addWidget(media_group)
     
     def toggle_login_fields(self):
         """切换登录字段的显示状态"""
-        is_checked = self.login_checkbox.isChecked()
-        self.username_label.setVisible(is_checked)
-        self.username_input.setVisible(is_checked)
-        self.password_label.setVisible(is_checked)
-        self.password_input.setVisible(is_checked)
-        self.login_button.setVisible(is_checked)
-        self.manual_login_checkbox.setVisible(is_checked)
-        
-        # 如果选择手动登录，禁用用户名和密码输入
-        if is_checked:
-            manual_checked = self.manual_login_checkbox.isChecked()
-            self.username_input.setEnabled(not manual_checked)
-            self.password_input.setEnabled(not manual_checked)
+        # 暂停选项区域的刷新，多个控件的显示状态切换完后只重新布局和绘制一次
+        self.options_group.setUpdatesEnabled(False)
+        try:
+            is_checked = self.login_checkbox.isChecked()
+            for widget in (self.username_label, self.username_input, self.password_label,
+                           self.password_input, self.login_button, self.manual_login_checkbox):
+                widget.setVisible(is_checked)
+            
+            # 如果选择手动登录，禁用用户名和密码输入
+            if is_checked:
+                manual_checked = self.manual_login_checkbox.isChecked()
+                self.username_input.setEnabled(not manual_checked)
+                self.password_input.setEnabled(not manual_checked)
+        finally:
+            self.options_group.setUpdatesEnabled(True)
     
     def browse_download_path(self):
         """浏览下载路径"""
@@ -276,31 +450,56 @@ class MediaCrawlerUI(QMainWindow):
     
     def log(self, message: str):
         """记录日志信息"""
-        self.log_text.append(message)
+        self._log_buffer.append(message)
+        if not self._log_timer.isActive():
+            self._log_timer.start()
+        # 同时输出到Python日志；INFO级别未启用时不创建日志记录，消息原样传入不再做%格式化
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('%s', message)
+    
+    def _flush_log(self):
+        """将缓冲的日志一次性追加到日志区域"""
+        if not self._log_buffer:
+            return
+        self.log_text.appendPlainText('\n'.join(self._log_buffer))
+        self._log_buffer.clear()
         # 滚动到底部
-        self.log_text.verticalScrollBar().setValue(self.log_text.verticalScrollBar().maximum())
-        # 同时输出到Python日志
-        logger.info(message)
+        scroll_bar = self.log_text.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+    
+    def prewarm_urls(self):
+        """输入URL后在后台预先获取robots.txt并建立连接，缩短随后爬取的等待时间"""
+        urls = [url for url in self.url_input.text().split() if url.startswith(('http://', 'https://'))]
+        if urls:
+            self.submit(PrewarmWorker(urls))
     
     def start_crawl(self):
         """开始爬取任务"""
-        url = self.url_input.text().strip()
-        if not url:
+        urls = self.url_input.text().split()
+        if not urls:
             QMessageBox.warning(self, "警告", "请输入有效的URL")
             return
         
-        # 禁用爬取按钮
-        self.crawl_button.setEnabled(False)
-        self.progress_bar.setValue(0)
-        
-        # 创建并启动爬取线程
-        self.crawler_thread = CrawlerThread(url)
-        self.crawler_thread.progress_update.connect(self.update_progress)
-        self.crawler_thread.log_message.connect(self.log)
-        self.crawler_thread.crawl_complete.connect(self.on_crawl_complete)
-        self.crawler_thread.error_occurred.connect(self.on_error)
-        
-        self.crawler_thread.start()
+        # 合并重复的爬取请求：相同的URL正在爬取时忽略，不同的URL则取消之前的任务
+        if self._crawl_worker is not None:
+            if self._crawl_worker.urls == urls:
+                self.log("相同的URL正在爬取中，忽略重复请求")
+                return
+            self._crawl_worker.cancel()
+            self.log("已取消之前的爬取任务")
+        
+        self.update_progress(0)
+        
+        # 创建爬取任务，连接信号后提交到线程池
+        worker = CrawlerWorker(urls, force_refresh=self.force_refresh_checkbox.isChecked())
+        self._crawl_worker = worker
+        worker.signals.progress_update.connect(self.on_crawl_progress, Qt.QueuedConnection)
+        worker.signals.log_message.connect(self.log, Qt.QueuedConnection)
+        worker.signals.crawl_complete.connect(self.on_crawl_complete)
+        worker.signals.crawl_finished.connect(self.on_crawl_finished)
+        worker.signals.error_occurred.connect(self.on_crawl_error)
+        
+        self.submit(worker)
     
     def start_download(self):
         """开始下载任务"""
@@ -314,30 +513,46 @@ class MediaCrawlerUI(QMainWindow):
             QMessageBox.warning(self, "警告", "请选择有效的下载路径")
             return
         
-        # 确保下载路径存在
-        os.makedirs(download_path, exist_ok=True)
-        
-        # 获取下载类型
-        download_type_index = self.download_type_combo.currentIndex()
-        download_type_map = {0: 'both', 1: 'video', 2: 'audio'}
-        download_type = download_type_map.get(download_type_index, 'both')
-        
         # 禁用下载按钮
         self.download_button.setEnabled(False)
-        self.progress_bar.setValue(0)
+        self.update_progress(0)
+        
+        # 创建下载任务，连接信号后提交到下载线程池
+        worker = self._create_download_worker(self.current_media_info, download_path)
+        worker.signals.progress_update.connect(self.update_progress, Qt.QueuedConnection)
+        worker.signals.download_complete.connect(self.on_download_complete)
+        worker.signals.error_occurred.connect(self.on_error)
+        
+        self.download_pool.start(worker)
+    
+    def auto_download(self, media_info: Dict[str, Any]):
+        """爬取完成后立即下载，批量爬取时已爬取完的媒体无需等待其余URL爬取结束；
+        结果和错误只记录到日志，不弹出对话框"""
+        if not media_info.get('video_url') and not media_info.get('audio_url'):
+            self.log(f"没有可下载的媒体URL，跳过自动下载: {media_info.get('title', '未知媒体')}")
+            return
+        download_path = self.download_path_input.text().strip()
+        if not download_path:
+            self.log("下载路径为空，跳过自动下载")
+            return
         
-        # 创建并启动下载线程
-        self.download_thread = DownloadThread(
-            self.current_media_info, 
-            download_path, 
-            download_type
-        )
-        self.download_thread.progress_update.connect(self.update_progress)
-        self.download_thread.log_message.connect(self.log)
-        self.download_thread.download_complete.connect(self.on_download_complete)
-        self.download_thread.error_occurred.connect(self.on_error)
+        self.download_pool.start(self._create_download_worker(media_info, download_path))
+    
+    def _create_download_worker(self, media_info: Dict[str, Any], download_path: str) -> DownloadWorker:
+        """按当前的下载设置创建下载任务"""
+        # 确保下载路径存在，已确认过的路径不再重复检查(下载时media_crawler仍会确保目录存在)
+        dir_key = os.path.normpath(download_path)
+        if dir_key not in self._verified_dirs:
+            os.makedirs(download_path, exist_ok=True)
+            self._verified_dirs.add(dir_key)
         
-        self.download_thread.start()
+        # 获取下载类型
+        download_type_index = self.download_type_combo.currentIndex()
+        download_type = _DL_TYPES[download_type_index] if 0 <= download_type_index < len(_DL_TYPES) else 'both'
+        
+        worker = DownloadWorker(media_info, download_path, download_type)
+        worker.signals.log_message.connect(self.log, Qt.QueuedConnection)
+        return worker
     
     def start_login(self):
         """开始登录任务"""
@@ -359,33 +574,65 @@ class MediaCrawlerUI(QMainWindow):
         # 禁用登录按钮
         self.login_button.setEnabled(False)
         
-        # 创建并启动登录线程
-        self.login_thread = LoginThread(url, username, password, manual)
-        self.login_thread.log_message.connect(self.log)
-        self.login_thread.login_complete.connect(self.on_login_complete)
+        # 创建登录任务，连接信号后提交到线程池
+        worker = LoginWorker(url, username, password, manual)
+        worker.signals.log_message.connect(self.log, Qt.QueuedConnection)
+        worker.signals.login_complete.connect(self.on_login_complete)
         
-        self.login_thread.start()
+        self.submit(worker)
+    
+    def submit(self, worker: QRunnable) -> None:
+        """提交后台任务到线程池，须在连接好任务的信号后调用"""
+        self.pool.start(worker)
     
     def update_progress(self, value: int):
         """更新进度条"""
-        self.progress_bar.setValue(value)
+        self._pending_progress = value
+        if not self._progress_timer.isActive():
+            self._progress_timer.start()
+    
+    def _flush_progress(self):
+        """将最新的进度值应用到进度条"""
+        if self._pending_progress is not None and self._pending_progress != self.progress_bar.value():
+            self.progress_bar.setValue(self._pending_progress)
+        self._pending_progress = None
+    
+    def _is_current_crawl(self) -> bool:
+        """信号是否来自当前的爬取任务；任务在发送信号后才被取代时，排队中的信号据此丢弃"""
+        return self._crawl_worker is not None and self.sender() is self._crawl_worker.signals
+    
+    def on_crawl_progress(self, value: int):
+        """爬取进度回调"""
+        if self._is_current_crawl():
+            self.update_progress(value)
+    
+    def on_crawl_error(self, error_msg: str):
+        """爬取错误回调"""
+        if self._is_current_crawl():
+            self.on_error(error_msg)
     
     def on_crawl_complete(self, media_info: Dict[str, Any]):
         """爬取完成回调"""
+        if not self._is_current_crawl():
+            return
         # 保存媒体信息
         self.current_media_info = media_info
         
-        # 显示媒体信息
-        info_text = "媒体信息:\n"
-        for key, value in media_info.items():
-            info_text += f"{key}: {value}\n"
-        
-        self.media_info_text.setText(info_text)
+        # 显示媒体信息，按纯文本设置，无需HTML解析
+        self.media_info_text.setPlainText("媒体信息:\n" + "\n".join(
+            f"{key}: {_format_media_value(value)}" for key, value in media_info.items()))
         
         # 启用下载按钮
         self.download_button.setEnabled(True)
-        # 重新启用爬取按钮
-        self.crawl_button.setEnabled(True)
+        
+        if self.auto_download_checkbox.isChecked():
+            self.auto_download(media_info)
+    
+    def on_crawl_finished(self):
+        """爬取任务结束回调(批量爬取时所有URL都处理完后)"""
+        # 已被取代的任务结束时不影响当前任务
+        if self._is_current_crawl():
+            self._crawl_worker = None
     
     def on_download_complete(self, result: Dict[str, str]):
         """下载完成回调"""
@@ -409,16 +656,12 @@ class MediaCrawlerUI(QMainWindow):
     def on_error(self, error_msg: str):
         """错误处理回调"""
         # 重新启用相关按钮
-        self.crawl_button.setEnabled(True)
         self.download_button.setEnabled(True)
         self.login_button.setEnabled(True)
         
         # 显示错误消息
         QMessageBox.critical(self, "错误", error_msg)
 
-# JSON模块导入
-import json
-
 def main():
     """主函数"""
     # 创建应用程序